@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 import yaml
 import matplotlib.pyplot as plt
-import os
+import profilspeicher
 from matplotlib.collections import LineCollection
 from matplotlib.ticker import FuncFormatter
 
@@ -13,20 +13,19 @@ halt_am_ende = True          # True = Zug hält am Ende
 
 # Konstanten die nicht geändert werden sollen
 yaml_pfad = "2_Vprofil.yaml" # Zielprofil (YAML)
-csv_ordner = "csv"            # Ordner mit Simulationsdaten
+npy_ordner = "npy"            # Ordner mit dem Profilspeicher
 a_toleranz = 0.01             # Schwelle zur Phasenerkennung
 
-# === Dateinamen zusammensetzen ===
+# === Profilnamen zusammensetzen ===
 v_start = "v" if start_v else "0"
 v_stop = "0" if halt_am_ende else "v"
-csv_datei = f"{abschnitt}_{v_start}_to_{v_stop}.csv"
-csv_pfad = os.path.join(csv_ordner, csv_datei)
+profil = f"{abschnitt}_{v_start}_to_{v_stop}"
 
-if not os.path.exists(csv_pfad):
-    raise FileNotFoundError(f"❌ Datei nicht gefunden: {csv_pfad}")
-
-# === CSV laden ===
-df = pd.read_csv(csv_pfad)
+# === Profil aus dem Profilspeicher laden (memory-mapped) ===
+profile = profilspeicher.lade(npy_ordner)
+if profil not in profile:
+    raise KeyError(f"❌ Profil nicht gefunden: {profil}")
+df = pd.DataFrame({spalte: np.asarray(werte) for spalte, werte in profile[profil].items()})
 
 # === Zielprofil aus YAML laden ===
 with open(yaml_pfad, "r") as f:
@@ -47,7 +46,7 @@ for start, end, v in geschwindigkeits_map:
     step_x.extend([start, end])
     step_y.extend([v, v])
 
-# === Grenzen der Strecke aus CSV ===
+# === Grenzen der Strecke aus dem Profil ===
 start_x = df["Position [m]"].min()
 end_x = df["Position [m]"].max()
 
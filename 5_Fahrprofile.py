@@ -1,13 +1,122 @@
 import os
 import json
+import bisect
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+import messung
+import profilspeicher
 
 # Einstellungen
 beschleunigen = 0.9
 bremsen = 0.9
+worker = 1  # > 1: Profile parallel in so vielen Prozessen rechnen
+csv_export = False  # True: zusätzlich je Profil eine CSV (auf 0.1 gerundet) schreiben
 
-def simuliere(streckenabschnitte, name_strecke, startgeschwindigkeit, bremsung_am_ende, beschleunigen, bremsen, dt=0.1, x_offset=0.0):
+def berechne_fahrprofil(streckenabschnitte, startgeschwindigkeit, bremsung_am_ende, beschleunigen, bremsen):
+    """Löst das Fahrprofil geschlossen für konstante Beschleunigung und Bremsung.
+
+    Rückgabe ist die Liste der Phasen-Stützpunkte mit Zeit "t" [s], Position "x" [m],
+    Geschwindigkeit "v" [m/s] und der Beschleunigung "a" [m/s²] der ab dort geltenden Phase.
+    """
+    # Gerechnet wird in s = v², dort sind alle Phasen linear in x
+    ziel_strecke = sum(abschnitt["length"] for abschnitt in streckenabschnitte)
+    eps = 1e-9
+
+    # Obergrenze s_max(x) rückwärts aufbauen: Zielgeschwindigkeit und Bremskurven
+    # zu jedem tieferen v_ziel bzw. zum Halt am Ende. Stücke als (x0, x1, s0, Steigung).
+    obergrenze = []
+    s_folge = 0.0 if bremsung_am_ende else float("inf")
+    x_ende = ziel_strecke
+    for abschnitt in reversed(streckenabschnitte):
+        x_anfang = x_ende - abschnitt["length"]
+        s_limit = (abschnitt["v_ziel"] / 3.6) ** 2
+        s_rechts = min(s_limit, s_folge)
+        if s_rechts >= s_limit:
+            obergrenze.append((x_anfang, x_ende, s_limit, 0.0))
+            s_folge = s_limit
+        else:
+            x_knick = x_ende - (s_limit - s_rechts) / (2 * bremsen)
+            if x_knick > x_anfang:
+                obergrenze.append((x_knick, x_ende, s_limit, -2 * bremsen))
+                obergrenze.append((x_anfang, x_knick, s_limit, 0.0))
+                s_folge = s_limit
+            else:
+                s_links = s_rechts + 2 * bremsen * (x_ende - x_anfang)
+                obergrenze.append((x_anfang, x_ende, s_links, -2 * bremsen))
+                s_folge = s_links
+        x_ende = x_anfang
+    obergrenze.reverse()
+
+    # Vorwärts: beschleunigen bis zur Obergrenze, ihr folgen, bei Überschreitung bremsen
+    phasen = []  # (x0, x1, s0, s1, a)
+    x, s = 0.0, startgeschwindigkeit ** 2
+    for p0, p1, c0, m in obergrenze:
+        while x < p1 - eps:
+            c = c0 + m * (x - p0)
+            if s < c - eps:
+                a_phase = beschleunigen
+                x_neu = min(p1, x + (c - s) / (2 * beschleunigen - m))
+                s_neu = s + 2 * a_phase * (x_neu - x)
+            elif s > c + eps:
+                a_phase = -bremsen
+                x_neu = p1 if m + 2 * bremsen <= eps else min(p1, x + (s - c) / (m + 2 * bremsen))
+                s_neu = max(s + 2 * a_phase * (x_neu - x), 0.0)
+            else:
+                a_phase = m / 2
+                x_neu = p1
+                s_neu = max(c0 + m * (p1 - p0), 0.0)
+            if phasen and phasen[-1][4] == a_phase:
+                phasen[-1] = (phasen[-1][0], x_neu, phasen[-1][2], s_neu, a_phase)
+            else:
+                phasen.append((x, x_neu, s, s_neu, a_phase))
+            x, s = x_neu, s_neu
+
+    # Zeiten der Phasen: v linear in t bei a != 0, sonst konstante Fahrt
+    stuetzpunkte = []
+    t = 0.0
+    for x0, x1, s0, s1, a_phase in phasen:
+        v0, v1 = np.sqrt(s0), np.sqrt(s1)
+        stuetzpunkte.append({"t": t, "x": x0, "v": v0, "a": a_phase})
+        t += (v1 - v0) / a_phase if a_phase != 0 else (x1 - x0) / v0
+    v_ende = np.sqrt(phasen[-1][3]) if phasen else startgeschwindigkeit
+    stuetzpunkte.append({"t": t, "x": ziel_strecke, "v": v_ende, "a": 0.0})
+    return stuetzpunkte
+
+def abtasten(stuetzpunkte, dt=0.1, x_offset=0.0):
+    """Tastet die Phasen auf ein Zeitraster ab; die Phasengrenzen sind im Raster enthalten."""
+    t_p = np.array([p["t"] for p in stuetzpunkte])
+    x_p = np.array([p["x"] for p in stuetzpunkte])
+    v_p = np.array([p["v"] for p in stuetzpunkte])
+    a_p = np.array([p["a"] for p in stuetzpunkte])
+
+    zeiten = np.unique(np.round(np.concatenate([np.arange(0.0, t_p[-1], dt), t_p]), 9))
+    idx = np.searchsorted(t_p, zeiten, side="right") - 1
+    tau = zeiten - t_p[idx]
+    return {
+        "Zeit [s]": zeiten,
+        "Position [m]": x_p[idx] + v_p[idx] * tau + 0.5 * a_p[idx] * tau ** 2 + x_offset,
+        "Geschwindigkeit [m/s]": np.maximum(v_p[idx] + a_p[idx] * tau, 0.0),
+        "Beschleunigung [m/s²]": a_p[idx]
+    }
+
+@messung.gemessen
+def fahrprofil_spalten(streckenabschnitte, startgeschwindigkeit, bremsung_am_ende, beschleunigen, bremsen, dt=0.1, x_offset=0.0, methode="analytisch"):
+    """Berechnet ein Fahrprofil als Spalten-Dict mit denselben Spalten wie die CSV-Dateien"""
+    if methode == "analytisch":
+        stuetzpunkte = berechne_fahrprofil(streckenabschnitte, startgeschwindigkeit, bremsung_am_ende, beschleunigen, bremsen)
+        return abtasten(stuetzpunkte, dt, x_offset)
+    return integriere_numerisch(streckenabschnitte, startgeschwindigkeit, bremsung_am_ende, beschleunigen, bremsen, dt, x_offset)
+
+def speichere_csv(spalten, name_strecke, ordner="csv"):
+    os.makedirs(ordner, exist_ok=True)
+    df = pd.DataFrame(spalten)
+    pfad = f"{ordner}/{name_strecke}.csv"
+    df.to_csv(pfad, index=False, float_format="%.1f")
+    print(f"✅ Gespeichert: {pfad}")
+
+def integriere_numerisch(streckenabschnitte, startgeschwindigkeit, bremsung_am_ende, beschleunigen, bremsen, dt=0.1, x_offset=0.0):
+    """Ursprüngliche Zeitschritt-Integration, zum Vergleich mit dem analytischen Profil."""
     ziel_strecke = sum(abschnitt["length"] for abschnitt in streckenabschnitte)
     abschnittsgrenzen = []
     cum_length = 0
@@ -15,12 +124,25 @@ def simuliere(streckenabschnitte, name_strecke, startgeschwindigkeit, bremsung_a
         cum_length += abschnitt['length']
         abschnittsgrenzen.append((cum_length, abschnitt['v_ziel'] / 3.6))
 
+    # Grenzen sortiert ablegen; da x nur wächst, sucht bisect ab dem letzten Treffer weiter
+    grenzen_enden = [end for end, _ in abschnittsgrenzen]
+    cursor_ziel = 0
+    cursor_grenze = 0
+
     def get_v_ziel_at_position(x):
-        for end, v in abschnittsgrenzen:
-            if x <= end:
-                return v
+        nonlocal cursor_ziel
+        cursor_ziel = bisect.bisect_left(grenzen_enden, x, lo=cursor_ziel)
+        if cursor_ziel < len(abschnittsgrenzen):
+            return abschnittsgrenzen[cursor_ziel][1]
         return abschnittsgrenzen[-1][1]
 
+    def get_naechste_grenze(x):
+        nonlocal cursor_grenze
+        cursor_grenze = bisect.bisect_right(grenzen_enden, x, lo=cursor_grenze)
+        if cursor_grenze < len(abschnittsgrenzen):
+            return abschnittsgrenzen[cursor_grenze]
+        return None
+
     bremszonen = []
     position = ziel_strecke
 
@@ -61,8 +183,21 @@ def simuliere(streckenabschnitte, name_strecke, startgeschwindigkeit, bremsung_a
                     "v_ziel": v_next
                 })
 
+    # Intervallindex der Bremszonen: je Elementarintervall die berührenden Zonen in
+    # ursprünglicher Reihenfolge, damit weiterhin die erste passende Zone gewinnt
+    zonen_punkte = sorted({z["start"] for z in bremszonen} | {z["end"] for z in bremszonen})
+    zonen_je_intervall = [
+        [z for z in bremszonen if z["start"] <= rechts and z["end"] >= links]
+        for links, rechts in zip(zonen_punkte, zonen_punkte[1:] + zonen_punkte[-1:])
+    ]
+    cursor_zone = 0
+
     def get_bremszone_at_position(x, v):
-        for z in bremszonen:
+        nonlocal cursor_zone
+        cursor_zone = bisect.bisect_right(zonen_punkte, x, lo=cursor_zone)
+        if cursor_zone == 0:
+            return None
+        for z in zonen_je_intervall[cursor_zone - 1]:
             if z["start"] <= x <= z["end"] and v > z["v_ziel"]:
                 return z
         return None
@@ -81,11 +216,10 @@ def simuliere(streckenabschnitte, name_strecke, startgeschwindigkeit, bremsung_a
         v_ziel_raw = get_v_ziel_at_position(x)
         s_verfuegbar = ziel_strecke - x
         v_next = v_ziel_raw
-        for grenze, v_abschnitt in abschnittsgrenzen:
-            if grenze > x:
-                s_verfuegbar = grenze - x
-                v_next = v_abschnitt
-                break
+        naechste_grenze = get_naechste_grenze(x)
+        if naechste_grenze:
+            s_verfuegbar = naechste_grenze[0] - x
+            v_next = naechste_grenze[1]
 
         v_erreichbar = np.sqrt(v**2 + 2 * beschleunigen * s_verfuegbar)
         v_ziel = min(v_erreichbar, v_next)
@@ -127,16 +261,12 @@ def simuliere(streckenabschnitte, name_strecke, startgeschwindigkeit, bremsung_a
         zeiten.append(t)
         beschleunigungen.append((geschwindigkeit_ms[-1] - geschwindigkeit_ms[-2]) / dt)
 
-    os.makedirs("csv", exist_ok=True)
-    df = pd.DataFrame({
+    return {
         "Zeit [s]": zeiten,
         "Position [m]": positions,
         "Geschwindigkeit [m/s]": geschwindigkeit_ms,
         "Beschleunigung [m/s²]": beschleunigungen
-    })
-    pfad = f"csv/{name_strecke}.csv"
-    df.to_csv(pfad, index=False, float_format="%.1f")
-    print(f"✅ Gespeichert: {pfad}")
+    }
 
 def vorheriger_abschnitt_name(aktueller, daten):
     abschnitte = list(daten.keys())
@@ -148,38 +278,246 @@ def vorheriger_abschnitt_name(aktueller, daten):
         pass
     return None
 
-if __name__ == "__main__":
-    with open("json/streckenabschnitte.json") as f:
-        daten = json.load(f)
+@messung.gemessen
+def simuliere_batch(profile, dt=0.1):
+    """Löst viele Fahrprofile gemeinsam in einem NumPy-Durchlauf (Modell wie berechne_fahrprofil).
+
+    Jedes Profil ist ein Dict mit "streckenabschnitte", "startgeschwindigkeit" [m/s],
+    "bremsung_am_ende" und optional "beschleunigen", "bremsen", "x_offset".
+    Rückgabe: Zeitraster "t" und "x", "v", "a" der Form (n_profile, n_schritte), nach dem
+    Fahrtende mit NaN gefüllt, dazu Fahrzeit "T", Endgeschwindigkeit "v_ende" und die
+    exakten Phasen-Stützpunkte "phasen" (je Profil gleich viele, teils mit Länge null).
+    """
+    n = len(profile)
+    n_seg = max(len(p["streckenabschnitte"]) for p in profile)
+    a = np.array([p.get("beschleunigen", beschleunigen) for p in profile], dtype=float)[:, None]
+    b = np.array([p.get("bremsen", bremsen) for p in profile], dtype=float)[:, None]
+    s0 = np.array([p["startgeschwindigkeit"] for p in profile], dtype=float) ** 2
+    halt = np.array([p["bremsung_am_ende"] for p in profile], dtype=bool)
+    x_offset = np.array([p.get("x_offset", 0.0) for p in profile], dtype=float)[:, None]
+    eps = 1e-9
+
+    # Abschnitte links mit Nulllängen auffüllen, damit alle Profile gleich viele Teilstücke haben
+    laengen = np.zeros((n, n_seg))
+    limits = np.zeros((n, n_seg))
+    for i, p in enumerate(profile):
+        abschnitte = p["streckenabschnitte"]
+        k = n_seg - len(abschnitte)
+        laengen[i, k:] = [abschnitt["length"] for abschnitt in abschnitte]
+        limits[i, k:] = [(abschnitt["v_ziel"] / 3.6) ** 2 for abschnitt in abschnitte]
+        limits[i, :k] = limits[i, k]
+    x_enden = np.cumsum(laengen, axis=1)
+    # Anfang = Ende des Vorgängers (nicht x_enden - laengen), sonst liegen Stücke, die an der
+    # Bremsgrenze x_e enden, durch Rundung knapp dahinter und starten wieder vom Limit
+    x_anfaenge = np.concatenate([np.zeros((n, 1)), x_enden[:, :-1]], axis=1)
+    ziel = x_enden[:, -1]
+
+    # Obergrenze s_max(x) rückwärts: je Abschnitt ein flaches Stück und ein Bremsstück
+    o_x0 = np.empty((n, 2 * n_seg))
+    o_x1 = np.empty((n, 2 * n_seg))
+    o_c0 = np.empty((n, 2 * n_seg))
+    o_m = np.empty((n, 2 * n_seg))
+    s_folge = np.where(halt, 0.0, np.inf)
+    for k in reversed(range(n_seg)):
+        s_rechts = np.minimum(limits[:, k], s_folge)
+        x_knick = np.clip(x_enden[:, k] - (limits[:, k] - s_rechts) / (2 * b[:, 0]), x_anfaenge[:, k], x_enden[:, k])
+        s_knick = s_rechts + 2 * b[:, 0] * (x_enden[:, k] - x_knick)
+        s_folge = np.where(x_knick > x_anfaenge[:, k], limits[:, k], s_knick)
+        o_x0[:, 2 * k], o_x1[:, 2 * k], o_c0[:, 2 * k], o_m[:, 2 * k] = x_anfaenge[:, k], x_knick, s_folge, 0.0
+        o_x0[:, 2 * k + 1], o_x1[:, 2 * k + 1], o_c0[:, 2 * k + 1], o_m[:, 2 * k + 1] = x_knick, x_enden[:, k], s_knick, -2 * b[:, 0]
+    o_c1 = o_c0 + o_m * (o_x1 - o_x0)
 
+    # Startgeschwindigkeit über der Obergrenze: bremsen bis zum ersten Schnitt mit ihr
+    d0 = s0[:, None] - 2 * b * o_x0 - o_c0
+    d1 = s0[:, None] - 2 * b * o_x1 - o_c1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_schnitt = np.where(d0 <= eps, o_x0, np.where(d1 <= eps, o_x0 + d0 / (o_m + 2 * b), np.inf))
+    x_e = np.minimum(x_schnitt.min(axis=1), ziel)[:, None]
+    s_e = np.maximum(s0[:, None] - 2 * b * x_e, 0.0)
+
+    # Ab x_e gilt s(x) = 2a·x + min(s_e - 2a·x_e, min_{x_e<=y<=x} (s_max(y) - 2a·y))
+    vorbei = o_x1 <= x_e + eps
+    x0 = np.maximum(o_x0, x_e)
+    x1 = np.maximum(o_x1, x_e)
+    c0 = o_c0 + o_m * (x0 - o_x0)
+    h0 = np.where(vorbei, np.inf, c0 - 2 * a * x0)
+    h1 = np.where(vorbei, np.inf, o_c1 - 2 * a * x1)
+    g = np.minimum.accumulate(np.concatenate([s_e - 2 * a * x_e, h1[:, :-1]], axis=1), axis=1)
+    with np.errstate(invalid="ignore"):
+        x_c = np.where(vorbei, x0, x0 + np.clip((h0 - g) / (2 * a - o_m), 0.0, x1 - x0))
+    # Ohne Folgestück (x_c = x1) endet das Beschleunigen unter der Obergrenze
+    with np.errstate(invalid="ignore"):
+        s_a0 = np.where(vorbei, s_e, 2 * a * x0 + np.minimum(g, h0))
+        s_a1 = np.where(vorbei, s_e, 2 * a * x_c + np.minimum(g, h0 + (o_m - 2 * a) * (x_c - x0)))
+    folgen = x_c < x1
+    s_c = np.where(folgen, o_c0 + o_m * (x_c - o_x0), s_a1)
+    s_c1 = np.where(folgen, o_c1, s_a1)
+
+    # Phasen in Streckenreihenfolge: Überschreitung, dann je Stück Beschleunigen und Folgen
+    ph_xa = np.concatenate([np.zeros((n, 1)), np.stack([x0, x_c], axis=2).reshape(n, -1)], axis=1)
+    ph_xb = np.concatenate([x_e, np.stack([x_c, x1], axis=2).reshape(n, -1)], axis=1)
+    ph_sa = np.concatenate([s0[:, None], np.stack([s_a0, s_c], axis=2).reshape(n, -1)], axis=1)
+    ph_sb = np.concatenate([s_e, np.stack([s_a1, s_c1], axis=2).reshape(n, -1)], axis=1)
+    ph_a = np.concatenate([-b, np.stack([np.broadcast_to(a, x0.shape), o_m / 2], axis=2).reshape(n, -1)], axis=1)
+
+    ph_va = np.sqrt(np.maximum(ph_sa, 0.0))
+    ph_vb = np.sqrt(np.maximum(ph_sb, 0.0))
+    dx = ph_xb - ph_xa
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dauer = np.where(dx <= eps, 0.0, np.where(ph_a != 0, (ph_vb - ph_va) / ph_a, dx / ph_va))
+    ph_t = np.cumsum(dauer, axis=1) - dauer
+    T = dauer.sum(axis=1)
+
+    # Abtasten auf ein gemeinsames Zeitraster; searchsorted zeilenweise über versetzte Schlüssel
+    n_schritte = int(np.floor(T.max() / dt)) + 1
+    t = np.arange(n_schritte) * dt
+    versatz = (T.max() + 1.0 + dt) * np.arange(n)[:, None]
+    idx = np.searchsorted((ph_t + versatz).ravel(), (t[None, :] + versatz).ravel(), side="right") - 1
+    idx = idx.reshape(n, n_schritte) - ph_t.shape[1] * np.arange(n)[:, None]
+    zeilen = np.arange(n)[:, None]
+    tau = t[None, :] - ph_t[zeilen, idx]
+    va, acc = ph_va[zeilen, idx], ph_a[zeilen, idx]
+    nach_ende = t[None, :] > T[:, None] + eps
+    return {
+        "t": t,
+        "x": np.where(nach_ende, np.nan, ph_xa[zeilen, idx] + va * tau + 0.5 * acc * tau ** 2 + x_offset),
+        "v": np.where(nach_ende, np.nan, np.maximum(va + acc * tau, 0.0)),
+        "a": np.where(nach_ende, np.nan, acc),
+        "T": T,
+        "v_ende": ph_vb[:, -1],
+        "phasen": {"t": ph_t, "x": ph_xa + x_offset, "v": ph_va, "a": ph_a}
+    }
+
+def simuliere_alle_batch(daten, fahrzeuge=None, dt=0.1):
+    """Löst alle Abschnitte × Start-/Stopptyp × Fahrzeuge aus streckenabschnitte.json als Batch.
+
+    fahrzeuge ist eine Liste von (beschleunigen, bremsen); ohne Angabe gelten die Einstellungen.
+    Ein erster Durchlauf über die 0_to_v-Profile liefert die startV der Nachfolger wie im
+    Einzellauf. Rückgabe: Liste der Schlüssel (fahrzeug_index, name) und das Batch-Ergebnis.
+    """
+    fahrzeuge = fahrzeuge or [(beschleunigen, bremsen)]
+    abschnitte = list(daten.keys())
+    offsets = np.cumsum([0.0] + [sum(t["length"] for t in daten[ab]) for ab in abschnitte])[:-1]
+
+    vorlauf = [
+        {"streckenabschnitte": daten[ab], "startgeschwindigkeit": 0.0, "bremsung_am_ende": False,
+         "beschleunigen": be, "bremsen": br}
+        for be, br in fahrzeuge for ab in abschnitte
+    ]
+    v_ende = simuliere_batch(vorlauf, dt)["v_ende"].reshape(len(fahrzeuge), len(abschnitte))
+
+    schluessel, profile = [], []
+    for f, (be, br) in enumerate(fahrzeuge):
+        for k, ab in enumerate(abschnitte):
+            strecke = daten[ab]
+            v_start = strecke[0]["v_ziel"] / 3.6
+            if k > 0 and abs(v_ende[f, k - 1] - v_start) > 0.1:
+                v_start = v_ende[f, k - 1]
+            for start_code, v0 in (("0", 0.0), ("v", v_start)):
+                for stop in (True, False):
+                    schluessel.append((f, f"{ab}_{start_code}_to_{'0' if stop else 'v'}"))
+                    profile.append({"streckenabschnitte": strecke, "startgeschwindigkeit": v0,
+                                    "bremsung_am_ende": stop, "beschleunigen": be, "bremsen": br,
+                                    "x_offset": offsets[k]})
+    return schluessel, simuliere_batch(profile, dt)
+
+def profil_name(abschnitt, start_typ, stop):
+    """Name im Format S1_0_to_v (start_typ "start0"/"startV", stop True = Halt am Ende)"""
+    start_code = "0" if start_typ == "start0" else "v"
+    stop_code = "0" if stop else "v"
+    return f"{abschnitt}_{start_code}_to_{stop_code}"
+
+def _rechne_profile(auftraege, cache=None, executor=None):
+    """Rechnet {name: (strecke, v0, stop, beschleunigen, bremsen, dt, methode, x_offset)}.
+
+    Profile werden ohne Offset gerechnet und gecacht und erst danach verschoben, damit
+    verschobene Abschnitte Treffer bleiben. Mit executor laufen die fehlenden Profile
+    parallel; das Ergebnis hat unabhängig davon die Reihenfolge der Aufträge.
+    """
+    fertig, offen = {}, {}
+    for name, (strecke, v0, stop, be, br, dt, methode, _) in auftraege.items():
+        schluessel = cache.schluessel("profil", strecke, v0, stop, be, br, dt, methode) if cache else None
+        spalten = cache.hole(schluessel) if cache else None
+        if spalten is not None:
+            fertig[name] = spalten
+            continue
+        args = (strecke, v0, stop, be, br, dt, 0.0, methode)
+        offen[name] = (schluessel, executor.submit(fahrprofil_spalten, *args) if executor else args)
+
+    for name, (schluessel, auftrag) in offen.items():
+        spalten = auftrag.result() if executor else fahrprofil_spalten(*auftrag)
+        if cache:
+            cache.lege_ab(schluessel, spalten)
+        fertig[name] = spalten
+
+    profile = {}
+    for name, auftrag in auftraege.items():
+        spalten = dict(fertig[name])
+        spalten["Position [m]"] = np.asarray(spalten["Position [m]"]) + auftrag[-1]
+        profile[name] = spalten
+    return profile
+
+@messung.gemessen
+def erzeuge_fahrprofile(daten, beschleunigen, bremsen, dt=0.1, methode="analytisch", cache=None, worker=None):
+    """Berechnet alle vier Profile je Abschnitt im Speicher; Rückgabe {name: Spalten-Dict}.
+
+    startV übernimmt wie bisher die Endgeschwindigkeit des Vorgänger-Profils 0_to_v,
+    falls sie um mehr als 0.1 m/s von v_ziel abweicht. Deshalb werden zuerst alle 0_to_v
+    gerechnet, danach die übrigen Profile. Mit einem ArtefaktCache werden nur Profile neu
+    gerechnet, deren Eingaben sich geändert haben; worker > 1 verteilt beide Durchläufe
+    auf einen ProcessPoolExecutor.
+    """
+    offsets = {}
     cum_offset = 0.0
     for abschnitt, strecke in daten.items():
-        v0_options = ["start0", "startV"]
-        stop_options = [True, False]
-
-        for start_typ in v0_options:
-            for stop in stop_options:
-                # Übersetze Starttyp
-                start_code = "0" if start_typ == "start0" else "v"
-                # Übersetze Stoptyp
-                stop_code = "0" if stop else "v"
-                # Neuer Name im Format: S1_0_to_v.csv
-                name = f"{abschnitt}_{start_code}_to_{stop_code}"
-
-                v0 = 0.0 if start_typ == "start0" else strecke[0]["v_ziel"] / 3.6
-
-                if start_typ == "startV":
-                    vorgaenger = vorheriger_abschnitt_name(abschnitt, daten)
-                    if vorgaenger:
-                        vorgaenger_path = f"csv/{vorgaenger}_0_to_v.csv"
-                        if os.path.exists(vorgaenger_path):
-                            df = pd.read_csv(vorgaenger_path)
-                            letzte_v = df["Geschwindigkeit [m/s]"].iloc[-1]
-                            ziel_v = strecke[0]["v_ziel"] / 3.6
-                            if abs(letzte_v - ziel_v) > 0.1:
-                                v0 = letzte_v
-
-                simuliere(strecke, name, v0, stop, beschleunigen, bremsen, x_offset=cum_offset)
-
+        offsets[abschnitt] = cum_offset
         # Korrigierte Berechnung der Offset-Distanz
         cum_offset += sum(abschnitt["length"] for abschnitt in strecke)
+
+    executor = ProcessPoolExecutor(max_workers=worker) if worker and worker > 1 else None
+    try:
+        vorlauf = _rechne_profile({
+            profil_name(abschnitt, "start0", False): (strecke, 0.0, False, beschleunigen, bremsen, dt, methode, offsets[abschnitt])
+            for abschnitt, strecke in daten.items()
+        }, cache, executor)
+
+        auftraege = {}
+        for abschnitt, strecke in daten.items():
+            v_start = strecke[0]["v_ziel"] / 3.6
+            vorgaenger = vorheriger_abschnitt_name(abschnitt, daten)
+            if vorgaenger:
+                letzte_v = vorlauf[profil_name(vorgaenger, "start0", False)]["Geschwindigkeit [m/s]"][-1]
+                if abs(letzte_v - v_start) > 0.1:
+                    v_start = letzte_v
+
+            for start_typ in ["start0", "startV"]:
+                for stop in [True, False]:
+                    name = profil_name(abschnitt, start_typ, stop)
+                    if name not in vorlauf:
+                        v0 = 0.0 if start_typ == "start0" else v_start
+                        auftraege[name] = (strecke, v0, stop, beschleunigen, bremsen, dt, methode, offsets[abschnitt])
+        rest = _rechne_profile(auftraege, cache, executor)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    # Deterministische Reihenfolge wie im Einzellauf: je Abschnitt 0_to_0, 0_to_v, v_to_0, v_to_v
+    profile = {}
+    for abschnitt in daten:
+        for start_typ in ["start0", "startV"]:
+            for stop in [True, False]:
+                name = profil_name(abschnitt, start_typ, stop)
+                profile[name] = vorlauf[name] if name in vorlauf else rest[name]
+    return profile
+
+if __name__ == "__main__":
+    with open("json/streckenabschnitte.json") as f:
+        daten = json.load(f)
+
+    profile = erzeuge_fahrprofile(daten, beschleunigen, bremsen, worker=worker)
+    pfad = profilspeicher.speichere(profile)
+    print(f"✅ Gespeichert: {pfad} ({len(profile)} Profile)")
+
+    if csv_export:
+        for name, spalten in profile.items():
+            speichere_csv(spalten, name)
@@ -1,81 +1,152 @@
 import os
 import json
+import numpy as np
 import pandas as pd
+import yaml
+import messung
+import profilspeicher
 
 # Einstellungen
-csv_ordner = "csv"
+npy_ordner = "npy"  # Profilspeicher aus 5_Fahrprofile.py
+csv_ordner = "csv"  # Rückfall, falls kein Profilspeicher vorhanden ist
 output_ordner = "json"
-os.makedirs(output_ordner, exist_ok=True)
-sections = [f"S{i}" for i in range(1, 10)]
 a_toleranz = 0.01
 toleranz = 0.1  # für die Konsistenzprüfung
 
+# Profiltypen, die in die Breaktimes eingehen
+PROFILTYPEN = ["0_to_0", "0_to_v", "v_to_0"]
+
 # Hilfsfunktionen
-def finde_letzte_neg_beginn(df, a_tol):
-    a = df["Beschleunigung [m/s²]"].values
-    for i in range(len(a) - 2, 0, -1):
-        if a[i] < -a_tol and a[i - 1] >= -a_tol:
-            return df.loc[i, "Zeit [s]"]
-    return None
-
-def finde_erste_pos_ende(df, a_tol):
-    a = df["Beschleunigung [m/s²]"].values
-    for i in range(1, len(a)):
-        if a[i-1] > a_tol and a[i] <= a_tol:
-            return df.loc[i, "Zeit [s]"]
-    return None
+def finde_breakpoints(zeit, a, von, bis, a_tol):
+    """Sucht in vielen Profilen zugleich nach Vorzeichenwechseln der Beschleunigung.
+
+    zeit und a sind die aneinandergehängten Spalten aller Profile als NumPy-Arrays,
+    von/bis ihre Zeilenbereiche. Rückgabe: Zeit des Beginns der letzten Bremsphase und
+    Zeit des Endes der ersten Beschleunigungsphase je Profil (NaN, wenn es keine gibt).
+    """
+    # Zeile i ist Treffer, wenn der Wechsel zwischen i-1 und i liegt
+    neg = np.flatnonzero((a[1:] < -a_tol) & (a[:-1] >= -a_tol)) + 1
+    pos = np.flatnonzero((a[:-1] > a_tol) & (a[1:] <= a_tol)) + 1
+    zeit_nan = np.append(zeit, np.nan)  # Index len(zeit) steht für "kein Treffer"
+
+    # Bremsbeginn: letzter Treffer in [von+1, bis-2]
+    neg = np.append(-1, neg)
+    k = np.searchsorted(neg, bis - 1) - 1
+    t_neg = zeit_nan[np.where(neg[k] >= von + 1, neg[k], len(zeit))]
+
+    # Beschleunigungsende: erster Treffer in [von+1, bis-1]
+    pos = np.append(pos, len(zeit))
+    k = np.searchsorted(pos, von + 1)
+    t_pos = zeit_nan[np.where(pos[k] <= bis - 1, pos[k], len(zeit))]
+    return t_neg, t_pos
 
 def vergleiche_zeiten(name, v1, v2, tol=0.1):
     abweichung = abs(v1 - v2)
     if abweichung > tol:
         print(f"{name}: {v1:.2f} vs. {v2:.2f} → Δ={abweichung:.2f} ❌ NICHT GLEICH")
 
-# Ergebnisstruktur
-daten = {}
-
-# Verarbeitung pro Abschnitt
-for section in sections:
-    try:
-        df_0_0 = pd.read_csv(os.path.join(csv_ordner, f"{section}_0_to_0.csv"))
-        df_0_v = pd.read_csv(os.path.join(csv_ordner, f"{section}_0_to_v.csv"))
-        df_v_0 = pd.read_csv(os.path.join(csv_ordner, f"{section}_v_to_0.csv"))
-        df_v_v = pd.read_csv(os.path.join(csv_ordner, f"{section}_v_to_v.csv"))
-
-        T_0_0 = df_0_0["Zeit [s]"].iloc[-1]
-        T_0_v = df_0_v["Zeit [s]"].iloc[-1]
-        T_v_0 = df_v_0["Zeit [s]"].iloc[-1]
-        T_v_v = df_v_v["Zeit [s]"].iloc[-1]
-
-        # FORWARD
-        t_break_0_fwd = finde_letzte_neg_beginn(df_0_0, a_toleranz)
-        t_break_V_fwd = finde_letzte_neg_beginn(df_v_0, a_toleranz)
-        remaining_0_fwd = T_0_0 - t_break_0_fwd if t_break_0_fwd is not None else None
-        delta_0v = T_0_0 - T_0_v
-        remaining_V_fwd = max(0.0, remaining_0_fwd - delta_0v) if remaining_0_fwd is not None else None
-
-        # BACKWARD
-        t_acc_end = finde_erste_pos_ende(df_0_0, a_toleranz)
-        t_break_0_bwd = T_0_0 - t_acc_end if t_acc_end is not None else None
-        remaining_0_bwd = t_acc_end
-        delta_v0 = T_0_0 - T_v_0
-        remaining_V_bwd = max(0.0, remaining_0_bwd - delta_v0) if remaining_0_bwd is not None else None
-        t_break_V_bwd = T_0_v - remaining_0_bwd if remaining_0_bwd is not None else None
-
-        # JSON speichern
+@messung.gemessen
+def breaktimes_batch(sections, profile, a_tol=a_toleranz):
+    """Breaktimes mehrerer Abschnitte in einem Array-Durchlauf über alle ihre Profile.
+
+    profile: {"<section>_<typ>": Profil} mit den Spalten "Zeit [s]" und
+    "Beschleunigung [m/s²]" (DataFrame aus der CSV oder Spalten-Dict aus 5_Fahrprofile.py).
+    Rückgabe: {section: Eintrag wie in breaktimes.json}; Abschnitte ohne Brems- oder
+    Beschleunigungsphase fehlen und werden gemeldet.
+    """
+    if not sections:
+        return {}
+    namen = [f"{section}_{typ}" for section in sections for typ in PROFILTYPEN]
+    zeit = [np.asarray(profile[name]["Zeit [s]"], dtype=float) for name in namen]
+    a = [np.asarray(profile[name]["Beschleunigung [m/s²]"], dtype=float) for name in namen]
+    laengen = np.array([len(z) for z in zeit])
+    bis = np.cumsum(laengen)
+    von = bis - laengen
+    zeit = np.concatenate(zeit)
+    t_neg, t_pos = finde_breakpoints(zeit, np.concatenate(a), von, bis, a_tol)
+
+    # Je Profiltyp ein Array über alle Abschnitte
+    T_0_0, T_0_v, T_v_0 = zeit[bis - 1].reshape(-1, 3).T
+    t_break_0_fwd, _, t_break_V_fwd = t_neg.reshape(-1, 3).T
+    t_acc_end = t_pos.reshape(-1, 3)[:, 0]
+
+    # FORWARD
+    remaining_0_fwd = T_0_0 - t_break_0_fwd
+    delta_0v = T_0_0 - T_0_v
+    remaining_V_fwd = np.maximum(0.0, remaining_0_fwd - delta_0v)
+
+    # BACKWARD
+    t_break_0_bwd = T_0_0 - t_acc_end
+    remaining_0_bwd = t_acc_end
+    delta_v0 = T_0_0 - T_v_0
+    remaining_V_bwd = np.maximum(0.0, remaining_0_bwd - delta_v0)
+    t_break_V_bwd = T_0_v - remaining_0_bwd
+
+    werte = np.stack([
+        t_break_0_fwd, t_break_V_fwd, remaining_0_fwd, remaining_V_fwd,
+        t_break_0_bwd, t_break_V_bwd, remaining_0_bwd, remaining_V_bwd
+    ], axis=1)
+
+    daten = {}
+    for section, w in zip(sections, werte):
+        if np.isnan(w).any():
+            print(f"❌ Fehler bei {section}: keine Brems- oder Beschleunigungsphase gefunden")
+            continue
+        w = [round(float(x), 2) for x in w]
         daten[section] = {
             "forward": {
-                "time_at_breakpoint_start0": round(t_break_0_fwd, 2),
-                "time_at_breakpoint_startV": round(t_break_V_fwd, 2),
-                "remaining_time_stop0": round(remaining_0_fwd, 2),
-                "remaining_time_stopV": round(remaining_V_fwd, 2)
+                "time_at_breakpoint_start0": w[0],
+                "time_at_breakpoint_startV": w[1],
+                "remaining_time_stop0": w[2],
+                "remaining_time_stopV": w[3]
             },
             "backward": {
-                "time_at_breakpoint_start0": round(t_break_0_bwd, 2),
-                "time_at_breakpoint_startV": round(t_break_V_bwd, 2),
-                "remaining_time_stop0": round(remaining_0_bwd, 2),
-                "remaining_time_stopV": round(remaining_V_bwd, 2)
+                "time_at_breakpoint_start0": w[4],
+                "time_at_breakpoint_startV": w[5],
+                "remaining_time_stop0": w[6],
+                "remaining_time_stopV": w[7]
             }
         }
+    return daten
+
+@messung.gemessen
+def berechne_breaktimes(profile, sections, a_tol=a_toleranz, tol=toleranz, cache=None):
+    """Breaktimes aller Abschnitte wie in json/breaktimes.json, inkl. Konsistenzprüfung"""
+    vorhanden = []
+    for section in sections:
+        fehlend = [f"{section}_{typ}" for typ in PROFILTYPEN if f"{section}_{typ}" not in profile]
+        if fehlend:
+            print(f"⚠️ Profil fehlt für {section}: {', '.join(fehlend)}")
+        else:
+            vorhanden.append(section)
+
+    # Mit Cache nur die Abschnitte rechnen, deren Profile sich geändert haben
+    gecacht, schluessel = {}, {}
+    if cache is not None:
+        for section in vorhanden:
+            # Schlüssel aus genau den Spalten, die die Auswertung liest
+            schluessel[section] = cache.schluessel("breaktimes", a_tol, [
+                (np.asarray(profile[f"{section}_{typ}"]["Zeit [s]"]),
+                 np.asarray(profile[f"{section}_{typ}"]["Beschleunigung [m/s²]"]))
+                for typ in PROFILTYPEN
+            ])
+            eintrag = cache.hole(schluessel[section])
+            if eintrag is not None:
+                gecacht[section] = eintrag
+
+    neu = breaktimes_batch([s for s in vorhanden if s not in gecacht], profile, a_tol)
+    if cache is not None:
+        for section, eintrag in neu.items():
+            cache.lege_ab(schluessel[section], eintrag)
+
+    daten = {}
+    for section in vorhanden:
+        if section in gecacht:
+            daten[section] = gecacht[section]
+        elif section in neu:
+            daten[section] = neu[section]
+        else:
+            continue
 
         # Konsistenzprüfung
         f = daten[section]["forward"]
@@ -83,20 +154,53 @@ for section in sections:
 
         f_start0 = f["time_at_breakpoint_start0"] + f["remaining_time_stop0"]
         b_start0 = b["time_at_breakpoint_start0"] + b["remaining_time_stop0"]
-        vergleiche_zeiten(f"{section} start0 → stop0", f_start0, b_start0, toleranz)
+        vergleiche_zeiten(f"{section} start0 → stop0", f_start0, b_start0, tol)
 
         f_startV = f["time_at_breakpoint_startV"] + f["remaining_time_stopV"]
         b_startV = b["time_at_breakpoint_startV"] + b["remaining_time_stopV"]
-        vergleiche_zeiten(f"{section} startV → stopV", f_startV, b_startV, toleranz)
+        vergleiche_zeiten(f"{section} startV → stopV", f_startV, b_startV, tol)
+    return daten
+
+def lade_sections(abschnitte_pfad="json/streckenabschnitte.json", infra_pfad="1_Infrastruktur.yaml"):
+    """Abschnitte in Routenreihenfolge aus streckenabschnitte.json, sonst aus der Infrastruktur"""
+    if os.path.exists(abschnitte_pfad):
+        with open(abschnitte_pfad, "r") as f:
+            return list(json.load(f).keys())
+    with open(infra_pfad, "r") as f:
+        infra_data = yaml.safe_load(f)
+    return [
+        element for element in infra_data["route"]
+        if infra_data["infrastructure"].get(element, {}).get("type") == "section"
+    ]
+
+def lade_profile_csv(sections, ordner=csv_ordner):
+    """Liest die vorhandenen Profil-CSVs der Abschnitte; fehlende Dateien werden gemeldet"""
+    profile = {}
+    for section in sections:
+        for typ in ["0_to_0", "0_to_v", "v_to_0", "v_to_v"]:
+            pfad = os.path.join(ordner, f"{section}_{typ}.csv")
+            try:
+                profile[f"{section}_{typ}"] = pd.read_csv(pfad)
+            except FileNotFoundError as e:
+                print(f"⚠️ Datei fehlt für {section}: {e}")
+    return profile
+
+if __name__ == "__main__":
+    os.makedirs(output_ordner, exist_ok=True)
+    sections = lade_sections()
+
+    try:
+        profile = profilspeicher.lade(npy_ordner)
+    except FileNotFoundError:
+        print(f"⚠️ Kein Profilspeicher in {npy_ordner}/, lese CSV-Dateien")
+        profile = lade_profile_csv(sections)
 
-    except FileNotFoundError as e:
-        print(f"⚠️ Datei fehlt für {section}: {e}")
-    except Exception as e:
-        print(f"❌ Fehler bei {section}: {e}")
+    # Alle Abschnitte in einem Durchlauf
+    daten = berechne_breaktimes(profile, sections)
 
-# Speichern der JSON-Datei
-output_path = os.path.join(output_ordner, "breaktimes.json")
-with open(output_path, "w") as f:
-    json.dump(daten, f, indent=2)
+    # Speichern der JSON-Datei
+    output_path = os.path.join(output_ordner, "breaktimes.json")
+    with open(output_path, "w") as f:
+        json.dump(daten, f, indent=2)
 
-print(f"\n✅ JSON erstellt: {output_path}")
\ No newline at end of file
+    print(f"\n✅ JSON erstellt: {output_path}")
@@ -7,6 +7,10 @@ def log_event(env, train_id, current_element, event, reserved):
 import simpy
 import yaml
 import json
+import importlib
+import messung
+from simulationslog import Ereignisprotokoll, ListenSenke, erzeuge_senke
+from taktfahrplan import erzeuge_taktfahrplan
 
 # ==== Einstellungen ====
 max_sim_time = 3600  # Maximale Simulationszeit in Sekunden
@@ -14,499 +18,727 @@ max_sim_time = 3600  # Maximale Simulationszeit in Sekunden
 
 
 log_schritte = 1    # Intervall in Sekunden fuer die Statusausgabe
-
-# ==== Infrastruktur laden ====
-with open("1_Infrastruktur.yaml") as f:
-    infra_data   = yaml.safe_load(f)
-    route        = infra_data["route"]
-    infra_yaml   = infra_data["infrastructure"]
-
-with open("3_Fahrplan.yaml") as f:
-    timetable_data = yaml.safe_load(f)["timetable"]
-
-with open("json/breaktimes.json") as f:
-    breaktimes   = json.load(f)
+konsolenausgabe = True  # False: keine Terminal-Ausgabe (Batch- und Benchmark-Läufe)
+log_senke = "datei"     # "datei" (laufend nach log_datei), "liste" (json/simulation_log.json am Ende), "zaehler" oder "keine"
+log_datei = "json/simulation_log.jsonl"  # mit Endung .jsonl.gz gzip-komprimiert
+
+deadlock_erkennung = True  # Lauf bei gegenseitiger Blockade von Zügen sofort mit Bericht beenden
+bis_alle_fertig = True     # Lauf endet, sobald alle Züge ihre Fahrt beendet haben (spätestens bei max_sim_time)
+breaktimes_im_speicher = False  # True: Breaktimes per pipeline.py aus den YAML-Dateien berechnen statt json/breaktimes.json zu lesen
+
+# ==== Eingaben laden ====
+def lade_eingaben(infra_pfad="1_Infrastruktur.yaml", fahrplan_pfad="3_Fahrplan.yaml",
+                  breaktimes_pfad="json/breaktimes.json", breaktimes_aus_pipeline=False):
+    """Liest Infrastruktur, Fahrplan und Breaktimes; Rückgabe (infra_data, timetable, breaktimes).
+
+    Der Fahrplan enthält einzelne Züge unter "timetable" und/oder Taktlinien unter "takt"
+    (siehe taktfahrplan.py), die hier zu Zügen expandiert werden.
+    """
+    with open(infra_pfad) as f:
+        infra_data = yaml.safe_load(f)
+
+    with open(fahrplan_pfad) as f:
+        fahrplan = yaml.safe_load(f)
+    timetable = fahrplan.get("timetable", []) + erzeuge_taktfahrplan(fahrplan.get("takt", []), infra_data["route"])
+
+    if breaktimes_aus_pipeline:
+        breaktimes = importlib.import_module("pipeline").erzeuge_breaktimes(infra_pfad)
+    else:
+        with open(breaktimes_pfad) as f:
+            breaktimes = json.load(f)
+    return infra_data, timetable, breaktimes
 
 # ==== Ressourcen pro Abschnitt ====
 class InfrastrukturElement:
     def __init__(self, env, name, capacity):
+        self.env  = env
         self.name = name
         self.res  = simpy.Resource(env, capacity=capacity)
-
-# ==== Simulationsumgebung ====
-env = simpy.Environment()
-infra = {
-    name: InfrastrukturElement(env, name, data.get("normal_capacity", 1))
-    for name, data in infra_yaml.items()
-}
-
-# ==== Globales Log fuer Zugstatus ====
-status_log = []  # fuer Systemzustände in regelmäßigen Intervallen
-
-# ==== Globales Zugstatus-Dictionary ====
-zugstatus = {}  # Format: {zug_id: {"element": current_element, "reserved": [liste der reservierten elemente]}}
-
-# ==== Status-Ausgabe-Prozess ====
-def status_ausgabe(env):
-    last_time = -1
-    while True:
-        # Zeit vor der Timeout-Operation abrufen und runden
-        current_time = round(env.now, 1)
+        self.freigabe = env.event()  # wird bei jeder Freigabe ausgelöst und erneuert
+
+    def freigeben(self, req):
+        """Gibt req frei und weckt alle Züge, die auf dieses Element warten"""
+        self.res.release(req)
+        ereignis, self.freigabe = self.freigabe, self.env.event()
+        ereignis.succeed()
+
+# ==== Vorberechnete Routentabellen ====
+def kompiliere_routentabellen(route, infra_yaml):
+    """Tabellen je Fahrtrichtung, indiziert mit der Position in der Route in dieser Richtung:
+       naechster_knoten: Position des nächsten Knotens mit Kapazität > 1 (sonst letzte Position),
+                         zugleich das Ende des Reservierungsbereichs ab dieser Position
+       phys_vorwaerts:   ob der Schritt vom Vorgänger auf dieses Element physisch vorwärts führt
+    """
+    routen_index = {}
+    for i, element in enumerate(route):
+        routen_index.setdefault(element, i)  # wie route.index: erstes Vorkommen
+
+    tabellen = {}
+    for richtung, elemente in (("forward", list(route)), ("backward", list(reversed(route)))):
+        naechster_knoten = [0] * len(elemente)
+        naechster = len(elemente) - 1
+        for p in range(len(elemente) - 1, -1, -1):
+            naechster_knoten[p] = naechster
+            if infra_yaml[elemente[p]].get("normal_capacity", 1) > 1:
+                naechster = p
+        phys_vorwaerts = [True] + [
+            routen_index[elemente[p - 1]] < routen_index[elemente[p]]
+            for p in range(1, len(elemente))
+        ]
+        tabellen[richtung] = {
+            "naechster_knoten": naechster_knoten,
+            "phys_vorwaerts": phys_vorwaerts
+        }
+    return routen_index, tabellen
+
+# ==== Simulation ====
+class Simulationsergebnis:
+    """Ergebnis eines Laufs: Endzeit, Zugstatus der noch aktiven Züge und die Log-Senken"""
+    def __init__(self, horizont, zeit, zugstatus, senken, deadlock=None, alle_fertig=False, schritte=0):
+        self.horizont  = horizont
+        self.zeit      = zeit         # Endzeit des Laufs; vor horizont bei Deadlock oder wenn alle Züge fertig sind
+        self.schritte  = schritte     # abgearbeitete SimPy-Ereignisse (env.step-Aufrufe)
+        self.alle_fertig = alle_fertig
+        self.zugstatus = zugstatus
+        self.senken    = senken
+        self.deadlock  = deadlock  # Bericht von Simulation.pruefe_deadlock(), falls der Lauf blockiert ist
+
+    def senke(self, typ):
+        """Erste Senke vom Typ typ (z. B. ListenSenke), sonst None"""
+        return next((s for s in self.senken if isinstance(s, typ)), None)
+
+class Simulation:
+    """Hält den gesamten Zustand eines Simulationslaufs; mehrere Läufe in einem Prozess
+       sind voneinander unabhängig."""
+    def __init__(self, infra_data, timetable, breaktimes, senken=None, konsolenausgabe=False, log_schritte=1,
+                 deadlock_erkennung=deadlock_erkennung, bis_alle_fertig=bis_alle_fertig):
+        self.route      = infra_data["route"]
+        self.infra_yaml = infra_data["infrastructure"]
+        self.timetable  = timetable
+        self.breaktimes = breaktimes
+        self.konsolenausgabe = konsolenausgabe
+        self.log_schritte    = log_schritte
+        self.deadlock_erkennung = deadlock_erkennung
+        self.bis_alle_fertig = bis_alle_fertig
+
+        # Simulationsumgebung und Ressourcen pro Abschnitt
+        self.env = simpy.Environment()
+        self.infra = {
+            name: InfrastrukturElement(self.env, name, data.get("normal_capacity", 1))
+            for name, data in self.infra_yaml.items()
+        }
+
+        # Zählt die abgearbeiteten SimPy-Ereignisse: env.run() ruft je Ereignis env.step() auf
+        self.schritte = 0
+        schritt = self.env.step
+        def zaehle_schritt():
+            self.schritte += 1
+            schritt()
+        self.env.step = zaehle_schritt
+        self.routen_index, self.routentabellen = kompiliere_routentabellen(self.route, self.infra_yaml)
+
+        # Log fuer Zugstatus: ein Eintrag je Änderung eines Zuges (siehe simulationslog.py)
+        self.protokoll = Ereignisprotokoll([ListenSenke()] if senken is None else senken)
+
+        # Format: {zug_id: {"element": current_element, "reserved": [liste der reservierten elemente]}}
+        self.zugstatus = {}
+
+        # Format: {zug_id: {element: request}}, in Reihenfolge der Reservierung (= Fahrtrichtung)
+        self.reservierungen = {}
+
+        # Warte-Graph für die Deadlock-Erkennung: wartende Züge mit den Elementen, die ihnen
+        # fehlen, und zu jeder zugeteilten Anforderung der Zug, der sie hält
+        self.wartende = {}     # {zug_id: [element]}
+        self.anforderer = {}   # {request: zug_id}
+        self.deadlock = None
+        self.abbruch = self.env.event()  # beendet env.run() vorzeitig
+        self.abbruch.callbacks.append(simpy.core.StopSimulation.callback)
+
+        # Anzahl der Zugprozesse, die ihre Fahrt noch nicht beendet haben
+        self.laufende_zuege = 0
+
+    # ==== Status-Ausgabe-Prozess ====
+    def status_ausgabe(self):
+        env, zugstatus = self.env, self.zugstatus
+        konsolenausgabe, log_schritte = self.konsolenausgabe, self.log_schritte
+
+        last_time = -1
+        while not (self.bis_alle_fertig and self.laufende_zuege == 0):
+            # Zeit vor der Timeout-Operation abrufen und runden
+            current_time = round(env.now, 1)
         
-        # Überprüfen, ob Zeit sich geändert hat und Status ausgeben
-        # Berücksichtige log_schritte fuer das Ausgabeintervall
-        if current_time != last_time and (int(current_time) % log_schritte == 0 or current_time == 0):
-            # Erstelle einen Eintrag fuer den aktuellen Zeitstempel
-            status_entry = {
-                "time": current_time,
-                "trains": {}
-            }
-            
-            if zugstatus:
-                # Sammle Informationen über alle aktiven Züge
-                for zug_id in sorted(zugstatus.keys()):
-                    status = zugstatus[zug_id]
-                    status_entry["trains"][zug_id] = {
-                        "element": status['element'],
-                        "status": status['status'],
-                        "direction": "forward" if status.get('is_forward', True) else "backward",
-                        "breaktime_info": status['breaktime_info'],
-                        "reserved": status['reserved']
-                    }
-            
-            # Füge den Eintrag zum Log hinzu
-            status_log.append(status_entry)
-            
-            # Optional: Zeige auch auf der Konsole an (kann fuer Debugging aktiviert werden)
-            if True:  # Setze auf False um Terminal-Ausgabe zu deaktivieren
-                print(f"\n[{current_time:.1f}s] Systemstatus:")
-                print("-" * 80)
+            # Überprüfen, ob Zeit sich geändert hat und Status ausgeben
+            # Berücksichtige log_schritte fuer das Ausgabeintervall
+            if current_time != last_time and (int(current_time) % log_schritte == 0 or current_time == 0):
+                # Optional: Zeige auch auf der Konsole an (kann fuer Debugging aktiviert werden)
+                if konsolenausgabe:
+                    print(f"\n[{current_time:.1f}s] Systemstatus:")
+                    print("-" * 80)
                 
-                if zugstatus:
-                    # Sortierte Ausgabe nach Zug-ID
-                    for zug_id in sorted(zugstatus.keys()):
-                        status = zugstatus[zug_id]
-                        print(f"  Zug {zug_id}:")
-                        print(f"    - Element: {status['element']}")
-                        print(f"    - Status: {status['status']}")
-                        print(f"    - Richtung: {'vorwärts' if status.get('is_forward', True) else 'rückwärts'}")
-                        print(f"    - Breaktime: {status['breaktime_info']}")
-                        print(f"    - Reserviert: {status['reserved']}")
-                else:
-                    print("  Keine Züge aktiv")
+                    if zugstatus:
+                        # Sortierte Ausgabe nach Zug-ID
+                        for zug_id in sorted(zugstatus.keys()):
+                            status = zugstatus[zug_id]
+                            print(f"  Zug {zug_id}:")
+                            print(f"    - Element: {status['element']}")
+                            print(f"    - Status: {status['status']}")
+                            print(f"    - Richtung: {'vorwärts' if status.get('is_forward', True) else 'rückwärts'}")
+                            print(f"    - Breaktime: {status['breaktime_info']}")
+                            print(f"    - Reserviert: {status['reserved']}")
+                    else:
+                        print("  Keine Züge aktiv")
                 
-                print("-" * 80)
+                    print("-" * 80)
             
-            last_time = current_time
+                last_time = current_time
             
-        # Nach der Ausgabe warten wir
-        yield env.timeout(log_schritte)  # Prüfe alle 0.1 Simulationseinheiten
-
-# ==== Zugprozess ====
-def zugfahrt(env, zug):
-    zid             = zug["train_id"]
-    verhalten       = zug["behaviour"]
-    depart_station  = zug["depart"]["station"]
-    depart_time     = zug["depart"]["time"]
-    arrival_station = zug["arrival"]["station"]
-    # Zeit, die die Abfahrtsstation vor der eigentlichen Abfahrt bereits belegt ist
-    occupied_before_start = zug["depart"].get("occupied_before_start", 0)
-    stops           = {s["station"]: s.get("stop_time", 0)
-                       for s in zug.get("stops", [])}
+            # Nach der Ausgabe warten wir
+            yield env.timeout(log_schritte)  # Prüfe alle 0.1 Simulationseinheiten
+
+    # ==== Deadlock-Erkennung ====
+    def halter(self, element):
+        """Züge, denen element gerade zugeteilt ist"""
+        return [self.anforderer[req] for req in self.infra[element].res.users]
+
+    def pruefe_deadlock(self, zid):
+        """Prüft, ob der gerade wartende Zug zid nie mehr weiterkommt; dann Bericht und Abbruch.
+
+        Ein wartender Zug braucht alle Elemente in wartende[zid]. Ein Element wird frei, wenn
+        es noch Kapazität hat oder einer seiner Halter weiterkommt; Halter, die nicht warten,
+        fahren oder halten und kommen weiter. Züge, die danach nicht weiterkommen, blockieren
+        sich gegenseitig. Neue Blockaden entstehen nur, wenn ein Zug zu warten beginnt, daher
+        genügt die Prüfung ab diesem Zug.
+        """
+        wartende, infra = self.wartende, self.infra
+
+        def wird_frei(element, weiter):
+            res = infra[element].res
+            return res.count < res.capacity or any(h not in wartende or h in weiter for h in self.halter(element))
+
+        # Häufigster Fall ohne Graphsuche: jedes fehlende Element hat einen fahrenden Halter
+        if all(wird_frei(element, ()) for element in wartende[zid]):
+            return
+
+        # Vom Zug aus erreichbare wartende Züge
+        erreichbar, offen = {zid}, [zid]
+        while offen:
+            for element in wartende[offen.pop()]:
+                for h in self.halter(element):
+                    if h in wartende and h not in erreichbar:
+                        erreichbar.add(h)
+                        offen.append(h)
+
+        # Fixpunkt: Züge, die weiterkommen
+        weiter, geaendert = set(), True
+        while geaendert:
+            geaendert = False
+            for z in erreichbar - weiter:
+                if all(wird_frei(element, weiter) for element in wartende[z]):
+                    weiter.add(z)
+                    geaendert = True
+        blockiert = erreichbar - weiter
+        if zid not in blockiert:
+            return
+
+        # Einen Zyklus für den Bericht nachgehen: je Zug ein Element, dessen Halter alle blockiert sind
+        zyklus, besucht, z = [], {}, zid
+        while z not in besucht:
+            besucht[z] = len(zyklus)
+            element = next(e for e in wartende[z] if not wird_frei(e, weiter))
+            h = next(h for h in self.halter(element) if h in blockiert)
+            zyklus.append({"zug": z, "wartet_auf": element, "gehalten_von": h})
+            z = h
+        self.deadlock = {
+            "zeit": self.env.now,
+            "zuege": sorted(blockiert),
+            "elemente": sorted({e for z in blockiert for e in wartende[z]} |
+                               {e for z in blockiert for e in self.reservierungen.get(z, {})}),
+            "wartet_auf": {z: list(wartende[z]) for z in sorted(blockiert)},
+            "haelt": {z: list(self.reservierungen.get(z, {})) for z in sorted(blockiert)},
+            "zyklus": zyklus[besucht[z]:]
+        }
+        if self.konsolenausgabe:
+            kette = " → ".join(f"{k['zug']} ({k['wartet_auf']})" for k in self.deadlock["zyklus"])
+            print(f"\n⛔ Deadlock bei {self.env.now:.1f}s: {kette} → {z}")
+        self.abbruch.succeed()
+
+    # ==== Zugprozess ====
+    def zugfahrt(self, zug):
+        env, infra, zugstatus, reservierungen, protokoll = self.env, self.infra, self.zugstatus, self.reservierungen, self.protokoll
+        route, infra_yaml, breaktimes = self.route, self.infra_yaml, self.breaktimes
+        routen_index, routentabellen = self.routen_index, self.routentabellen
+        wartende, anforderer = self.wartende, self.anforderer
+
+        zid             = zug["train_id"]
+        verhalten       = zug["behaviour"]
+        depart_station  = zug["depart"]["station"]
+        depart_time     = zug["depart"]["time"]
+        arrival_station = zug["arrival"]["station"]
+        # Zeit, die die Abfahrtsstation vor der eigentlichen Abfahrt bereits belegt ist
+        occupied_before_start = zug["depart"].get("occupied_before_start", 0)
+        stops           = {s["station"]: s.get("stop_time", 0)
+                           for s in zug.get("stops", [])}
+        # Optionaler Faktor auf alle Fahrzeiten des Zuges (z. B. aus monte_carlo.py)
+        fahrzeitfaktor  = zug.get("fahrzeitfaktor", 1.0)
+        # Optionale Zahl der Rückfahrten bei verhalten="return" (ohne Angabe pendelt der Zug)
+        rueckfahrten    = zug.get("rueckfahrten")
     
-    # Zugstatus wird bereits vor dem Start der Simulation initialisiert
-
-    def update_zugstatus(current_element=None, action=None, status=None, breaktime_info=None):
-        """Aktualisiert den globalen Zugstatus"""
-        if current_element:
-            zugstatus[zid]["element"] = current_element
-        if status:
-            zugstatus[zid]["status"] = status
-        if breaktime_info:
-            zugstatus[zid]["breaktime_info"] = breaktime_info
-        
-        # Aktualisiere die reservierten Elemente basierend auf dem aktuellen Status der Ressourcen
-        reserved_elements = [n for n, e in infra.items() 
-                           if e.res.count > 0 and any(u.proc == env.active_process for u in e.res.users)]
-        
-        # Sortiere die reservierten Elemente nach ihrer Position im Streckenverlauf
-        # basierend auf der aktuellen Fahrtrichtung
-        def route_element_order(element):
-            if element in route:
-                return route.index(element)
-            return -1  # Falls Element nicht in der Route
-        
-        # Hole die aktuelle Fahrtrichtung aus dem zugstatus
-        is_forward = zugstatus[zid].get("is_forward", True)
+        # Zugstatus wird bereits vor dem Start der Simulation initialisiert
+        eigene = reservierungen.setdefault(zid, {})
+
+        def reserviere(element):
+            """Fordert element an und trägt es nach der Zuteilung in die eigenen Reservierungen ein"""
+            req = infra[element].res.request()
+            anforderer[req] = zid
+            if req.triggered:
+                yield req
+            else:  # Element voll: in der Warteschlange der Ressource warten
+                yield from warte_auf(req, [element])
+            eigene[element] = req
+
+        def gib_frei(element):
+            """Gibt die eigene Reservierung von element frei (falls vorhanden)"""
+            req = eigene.pop(element, None)
+            if req is not None:
+                del anforderer[req]
+                infra[element].freigeben(req)
+                update_zugstatus(element, "release")
+
+        def warte_auf(ereignis, elemente):
+            """Wartet auf ereignis und trägt den Zug solange mit den fehlenden elemente in den Warte-Graphen ein"""
+            wartende[zid] = elemente
+            if self.deadlock_erkennung and self.deadlock is None:
+                self.pruefe_deadlock(zid)
+            try:
+                yield ereignis
+            finally:
+                del wartende[zid]
+
+        def update_zugstatus(current_element=None, action=None, status=None, breaktime_info=None):
+            """Aktualisiert den Zugstatus der Simulation"""
+            if current_element:
+                zugstatus[zid]["element"] = current_element
+            if status:
+                zugstatus[zid]["status"] = status
+            if breaktime_info:
+                zugstatus[zid]["breaktime_info"] = breaktime_info
         
-        # Sortiere nach Routenindex (bei forward) oder umgekehrt (bei backward)
-        if is_forward:
-            sorted_reserved = sorted(reserved_elements, key=route_element_order)
-        else:
-            sorted_reserved = sorted(reserved_elements, key=route_element_order, reverse=True)
+            # Die eigenen Reservierungen liegen bereits in Fahrtrichtung sortiert vor
+            sorted_reserved = list(eigene)
         
-        # Aktualisiere den Status
-        zugstatus[zid]["reserved"] = sorted_reserved
+            # Aktualisiere den Status
+            zugstatus[zid]["reserved"] = sorted_reserved
+            protokoll.melde(env.now, zid, zugstatus[zid])
         
-        # Führe auch den Log-Eintrag durch
-        if current_element and action:
-            log_event(env, zid, current_element, action, sorted_reserved)
-
-    def simulate_direction(depart_station, arrival_station):
-        idx_depart  = route.index(depart_station)
-        idx_arrival = route.index(arrival_station)
-        is_forward  = idx_depart < idx_arrival
-        route_used  = (
-            route[idx_depart:idx_arrival+1]
-            if is_forward else
-            list(reversed(route[idx_arrival:idx_depart+1]))
-        )
-
-        # Merke die aktuelle Richtung fuer die Sortierung der reservierten Elemente
-        zugstatus[zid]["is_forward"] = is_forward
+            # Führe auch den Log-Eintrag durch
+            if current_element and action:
+                log_event(env, zid, current_element, action, sorted_reserved)
+
+        def simulate_direction(depart_station, arrival_station, fahrt_nr=0):
+            """Fahrt von depart_station nach arrival_station; nur die erste Fahrt (fahrt_nr 0) wartet auf depart_time"""
+            erste_fahrt = fahrt_nr == 0
+            idx_depart  = routen_index[depart_station]
+            idx_arrival = routen_index[arrival_station]
+            is_forward  = idx_depart < idx_arrival
+            route_used  = (
+                route[idx_depart:idx_arrival+1]
+                if is_forward else
+                list(reversed(route[idx_arrival:idx_depart+1]))
+            )
+            # route_used[i] steht in der Richtungstabelle an Position versatz + i
+            tabelle = routentabellen["forward" if is_forward else "backward"]
+            versatz = idx_depart if is_forward else len(route) - 1 - idx_depart
+
+            # Merke die aktuelle Richtung fuer die Sortierung der reservierten Elemente
+            zugstatus[zid]["is_forward"] = is_forward
+            protokoll.melde(env.now, zid, zugstatus[zid])
         
-        # Reserviere die Abfahrtsstation bereits vor der eigentlichen Abfahrt, wenn spezifiziert
-        if is_forward and occupied_before_start > 0:
-            # Berechne den Zeitpunkt, zu dem die Vorabreservierung stattfinden soll
-            early_reservation_time = max(0, depart_time - occupied_before_start)
+            # Reserviere die Abfahrtsstation bereits vor der eigentlichen Abfahrt, wenn spezifiziert
+            if erste_fahrt and occupied_before_start > 0:
+                # Berechne den Zeitpunkt, zu dem die Vorabreservierung stattfinden soll
+                early_reservation_time = max(0, depart_time - occupied_before_start)
             
-            # Warte bis zum Zeitpunkt der Vorabreservierung
-            if env.now < early_reservation_time:
-                yield env.timeout(early_reservation_time - env.now)
+                # Warte bis zum Zeitpunkt der Vorabreservierung
+                if env.now < early_reservation_time:
+                    yield env.timeout(early_reservation_time - env.now)
             
-            # Reserviere die Abfahrtsstation vorzeitig
-            if not any(u.proc==env.active_process for u in infra[depart_station].res.users):
-                req = infra[depart_station].res.request()
-                yield req
-                update_zugstatus(
-                    current_element=depart_station, 
-                    action="early_reserve", 
-                    status="bereitgestellt", 
-                    breaktime_info=f"Abfahrtsstation {occupied_before_start}s vor Abfahrt reserviert"
-                )
+                # Reserviere die Abfahrtsstation vorzeitig
+                if depart_station not in eigene:
+                    yield from reserviere(depart_station)
+                    update_zugstatus(
+                        current_element=depart_station, 
+                        action="early_reserve", 
+                        status="bereitgestellt", 
+                        breaktime_info=f"Abfahrtsstation {occupied_before_start}s vor Abfahrt reserviert"
+                    )
                 
-                # Warte noch bis zur eigentlichen Abfahrtszeit
-                remaining_wait = max(0, depart_time - env.now)
-                if remaining_wait > 0:
+                    # Warte noch bis zur eigentlichen Abfahrtszeit
+                    remaining_wait = max(0, depart_time - env.now)
+                    if remaining_wait > 0:
+                        update_zugstatus(
+                            current_element=depart_station,
+                            action="waiting_for_departure",
+                            status="wartet auf Abfahrt",
+                            breaktime_info=f"Abfahrt in {remaining_wait:.1f}s geplant"
+                        )
+                        yield env.timeout(remaining_wait)
+            
+            # Sonst normale Abfahrtslogik ohne Vorabreservierung; die Rückfahrt startet sofort
+            elif erste_fahrt:
+                # Wenn Wartezeit bis zur Abfahrt notwendig ist
+                wait_time = max(0, depart_time - env.now)
+                if wait_time > 0:
                     update_zugstatus(
                         current_element=depart_station,
                         action="waiting_for_departure",
                         status="wartet auf Abfahrt",
-                        breaktime_info=f"Abfahrt in {remaining_wait:.1f}s geplant"
+                        breaktime_info=f"Abfahrt in {wait_time:.1f}s geplant"
                     )
-                    yield env.timeout(remaining_wait)
-            
-        # Sonst normale Abfahrtslogik (fuer Rückfahrt oder ohne Vorabreservierung)
-        elif is_forward:
-            # Wenn Wartezeit bis zur Abfahrt notwendig ist
-            wait_time = max(0, depart_time - env.now)
-            if wait_time > 0:
+                    yield env.timeout(wait_time)
+
+            # Erstreservierung Abfahrt
+            if erste_fahrt and occupied_before_start > 0:
+                # Die Abfahrtsstation wurde bereits vor der Abfahrt reserviert
+                # Keine erneute Reservierung notwendig
+                pass
+            elif depart_station not in eigene:
+                yield from reserviere(depart_station)
                 update_zugstatus(
-                    current_element=depart_station,
-                    action="waiting_for_departure",
-                    status="wartet auf Abfahrt",
-                    breaktime_info=f"Abfahrt in {wait_time:.1f}s geplant"
+                    current_element=depart_station, 
+                    action="reserve", 
+                    status="initialisiert", 
+                    breaktime_info=""
                 )
-                yield env.timeout(wait_time)
-
-        # Erstreservierung Abfahrt
-        if is_forward and occupied_before_start > 0:
-            # Die Abfahrtsstation wurde bereits vor der Abfahrt reserviert
-            # Keine erneute Reservierung notwendig
-            pass
-        elif not any(u.proc==env.active_process for u in infra[depart_station].res.users):
-            req = infra[depart_station].res.request()
-            yield req
-            update_zugstatus(
-                current_element=depart_station, 
-                action="reserve", 
-                status="initialisiert", 
-                breaktime_info=""
-            )
 
-        # Hilfsfunktionen fuer Reservierung
-        def finde_naechste_knoten_mit_mehr_kapazitaet(start_idx):
-            """Finde den nächsten Knoten mit Kapazität > 1 ab start_idx"""
-            for j in range(start_idx+1, len(route_used)):
-                k = route_used[j]
-                if infra_yaml[k]["normal_capacity"] > 1:
-                    return j
-            return len(route_used)-1
-
-        def versuche_reservierung(train, start_idx, limit_idx=None, include_highcap=True):
-            """Versuche Reservierung aller Abschnitte von start_idx+1 bis limit_idx
-               include_highcap=True bedeutet, dass auch der Knoten mit hoher Kapazität selbst reserviert wird
-            """
-            if limit_idx is None:
-                ziel_idx = finde_naechste_knoten_mit_mehr_kapazitaet(start_idx)
-            else:
-                ziel_idx = limit_idx
+            # Hilfsfunktionen fuer Reservierung
+            def finde_naechste_knoten_mit_mehr_kapazitaet(start_idx):
+                """Finde den nächsten Knoten mit Kapazität > 1 ab start_idx"""
+                return min(tabelle["naechster_knoten"][versatz + start_idx] - versatz, len(route_used)-1)
+
+            def versuche_reservierung(train, start_idx, limit_idx=None, include_highcap=True):
+                """Versuche Reservierung aller Abschnitte von start_idx+1 bis limit_idx
+                   include_highcap=True bedeutet, dass auch der Knoten mit hoher Kapazität selbst reserviert wird
+                """
+                if limit_idx is None:
+                    ziel_idx = finde_naechste_knoten_mit_mehr_kapazitaet(start_idx)
+                else:
+                    ziel_idx = limit_idx
                 
-            # Bestimme alle zu reservierenden Elemente
-            needed = route_used[start_idx+1:ziel_idx+1]
+                # Bestimme alle zu reservierenden Elemente
+                needed = route_used[start_idx+1:ziel_idx+1]
             
-            # Prüfe zuerst, ob alle Elemente frei oder vom eigenen Prozess reserviert sind
-            for n in needed:
-                r = infra[n].res
-                if not (r.count < r.capacity or any(u.proc==env.active_process for u in r.users)):
-                    return False
+                # Prüfe zuerst, ob alle Elemente frei oder vom eigenen Prozess reserviert sind
+                for n in needed:
+                    r = infra[n].res
+                    if not (r.count < r.capacity or n in eigene):
+                        return False
             
-            # Wenn alle verfügbar sind, reserviere sie nacheinander
-            for n in needed:
-                r = infra[n].res
-                if not any(u.proc==env.active_process for u in r.users):
-                    req = r.request()
-                    yield req
-                    update_zugstatus(n, "reserve")
-            return True
-
-        def kapazitaet_frei_oder_selbst_reserviert(start_idx, ziel_idx):
-            """Prüfe, ob alle Elemente zwischen start_idx+1 und ziel_idx frei oder selbst reserviert sind"""
-            needed = route_used[start_idx+1:ziel_idx+1]
-            for n in needed:
-                r = infra[n].res
-                if not (r.count < r.capacity or any(u.proc==env.active_process for u in r.users)):
-                    return False
-            return True
-
-        # Initiale Vorreservierung ab Startstation
-        # Reserviere explizit bis zum nächsten Knoten mit hoher Kapazität (einschließlich dieses Knotens)
-        start_idx = route_used.index(depart_station)
-        next_highcap_idx = finde_naechste_knoten_mit_mehr_kapazitaet(start_idx)
+                # Wenn alle verfügbar sind, reserviere sie nacheinander
+                for n in needed:
+                    if n not in eigene:
+                        yield from reserviere(n)
+                        update_zugstatus(n, "reserve")
+                return True
+
+            def blockierte_elemente(start_idx, ziel_idx):
+                """Elemente zwischen start_idx+1 und ziel_idx, die weder frei noch selbst reserviert sind"""
+                needed = route_used[start_idx+1:ziel_idx+1]
+                return [n for n in needed
+                        if not (infra[n].res.count < infra[n].res.capacity or n in eigene)]
+
+            def kapazitaet_frei_oder_selbst_reserviert(start_idx, ziel_idx):
+                """Prüfe, ob alle Elemente zwischen start_idx+1 und ziel_idx frei oder selbst reserviert sind"""
+                return not blockierte_elemente(start_idx, ziel_idx)
+
+            def warte_auf_freigabe(start_idx, ziel_idx):
+                """Schläft, bis eines der blockierenden Elemente freigegeben wird"""
+                blockiert = blockierte_elemente(start_idx, ziel_idx)
+                yield from warte_auf(env.any_of([infra[n].freigabe for n in blockiert]), blockiert)
+
+            # Initiale Vorreservierung ab Startstation
+            # Reserviere explizit bis zum nächsten Knoten mit hoher Kapazität (einschließlich dieses Knotens)
+            start_idx = route_used.index(depart_station)
+            next_highcap_idx = finde_naechste_knoten_mit_mehr_kapazitaet(start_idx)
         
-        # Warte bis Reservierung möglich
-        while not (yield from versuche_reservierung(zid, start_idx, next_highcap_idx)):
-            yield env.timeout(1)
-
-        # Durchlauf aller Zwischenabschnitte
-        for i in range(start_idx+1, len(route_used)-1):
-            current = route_used[i]
-            prev    = route_used[i-1]
-            next_el = route_used[i+1]
-
-            # Release previous element
-            for req in list(infra[prev].res.users):
-                if req.proc==env.active_process:
-                    infra[prev].res.release(req)
-                    update_zugstatus(prev, "release")
-
-            # Einfahrt in aktuelles Element
-            update_zugstatus(current, "start")
-
-            # Breaktime fuer Einfahrt (start0/startV)
-            section = current if current not in ["BDF","SO"] else prev
-            forward_phys = route.index(prev)<route.index(current)
-            bt = breaktimes.get(section, {}).get("forward" if forward_phys else "backward", {})
-            
-            # Zeit fuer Einfahrt in aktuelles Element 
-            # start0 wenn im vorherigen Element ein Halt war, sonst startV
-            start_key = f"time_at_breakpoint_{'start0' if prev in stops else 'startV'}"
-            breaktime_value = bt.get(start_key, 0)
-            direction = "forward" if forward_phys else "backward"
-            update_zugstatus(
-                current_element=current, 
-                action="start", 
-                status="in Fahrt", 
-                breaktime_info=f"{start_key} ({direction}): {breaktime_value:.1f}s"
-            )
-            yield env.timeout(breaktime_value)
+            # Warte bis Reservierung möglich
+            while not (yield from versuche_reservierung(zid, start_idx, next_highcap_idx)):
+                yield from warte_auf_freigabe(start_idx, next_highcap_idx)
+
+            # Durchlauf aller Zwischenabschnitte
+            for i in range(start_idx+1, len(route_used)-1):
+                current = route_used[i]
+                prev    = route_used[i-1]
+                next_el = route_used[i+1]
 
-            # Prüfe zuerst auf Halt im aktuellen Element, bevor Breakpoint-Reservierung versucht wird
-            if current in stops:
+                # Release previous element
+                gib_frei(prev)
+
+                # Einfahrt in aktuelles Element
+                update_zugstatus(current, "start")
+
+                # Breaktime fuer Einfahrt (start0/startV)
+                section = current if current not in (route[0], route[-1]) else prev
+                forward_phys = tabelle["phys_vorwaerts"][versatz + i]
+                bt = breaktimes.get(section, {}).get("forward" if forward_phys else "backward", {})
+            
+                # Zeit fuer Einfahrt in aktuelles Element 
+                # start0 wenn im vorherigen Element ein Halt war, sonst startV
+                start_key = f"time_at_breakpoint_{'start0' if prev in stops else 'startV'}"
+                breaktime_value = bt.get(start_key, 0) * fahrzeitfaktor
+                direction = "forward" if forward_phys else "backward"
                 update_zugstatus(
                     current_element=current, 
-                    action="stop", 
-                    status="Halt", 
-                    breaktime_info=f"Planmaessiger Halt fuer {stops[current]:.1f}s"
+                    action="start", 
+                    status="in Fahrt", 
+                    breaktime_info=f"{start_key} ({direction}): {breaktime_value:.1f}s"
                 )
-                yield env.timeout(stops[current])
+                yield env.timeout(breaktime_value)
+
+                # Prüfe zuerst auf Halt im aktuellen Element, bevor Breakpoint-Reservierung versucht wird
+                if current in stops:
+                    update_zugstatus(
+                        current_element=current, 
+                        action="stop", 
+                        status="Halt", 
+                        breaktime_info=f"Planmaessiger Halt fuer {stops[current]:.1f}s"
+                    )
+                    yield env.timeout(stops[current])
             
-            # Breakpoint-Logik erst nach dem Halt ausführen:
-            # 1. Prüfen, ob nächstes Element Kapazität = 1 oder >1 hat
-            # 2. Abhängig davon unterschiedliche Reservierungsstrategie und Fahrprofilwahl
-            if i+1 < len(route_used)-1:  # Überprüfe, ob wir nicht schon am Ende sind
-                next_el = route_used[i+1]
-                next_el_capacity = infra_yaml[next_el]["normal_capacity"]
-                next_stop = next_el in stops  # Hält der Zug im nächsten Element?
+                # Breakpoint-Logik erst nach dem Halt ausführen:
+                # 1. Prüfen, ob nächstes Element Kapazität = 1 oder >1 hat
+                # 2. Abhängig davon unterschiedliche Reservierungsstrategie und Fahrprofilwahl
+                if i+1 < len(route_used)-1:  # Überprüfe, ob wir nicht schon am Ende sind
+                    next_el = route_used[i+1]
+                    next_el_capacity = infra_yaml[next_el]["normal_capacity"]
+                    next_stop = next_el in stops  # Hält der Zug im nächsten Element?
                 
-                # Verschiedene Strategien je nach Kapazität des nächsten Elements
-                if next_el_capacity == 1:  # Nächstes Element hat Kapazität = 1
-                    # 1. Reserviere alle Elemente bis zur nächsten Entlastung
-                    next_highcap_idx = len(route_used) - 1  # Standard: Ende der Route
-                    for j in range(i+1, len(route_used)):
-                        k = route_used[j]
-                        if infra_yaml[k]["normal_capacity"] > 1:
-                            next_highcap_idx = j
-                            break
-                    
-                    # Warte, bis Reservierung möglich
-                    waiting_reported = False
-                    while not kapazitaet_frei_oder_selbst_reserviert(i, next_highcap_idx):
-                        if not waiting_reported:
-                            update_zugstatus(
-                                current_element=current, 
-                                action="waiting", 
-                                status="wartet", 
-                                breaktime_info="Wartet auf freie Kapazitaet"
-                            )
-                            waiting_reported = True
-                        yield env.timeout(1)
+                    # Verschiedene Strategien je nach Kapazität des nächsten Elements
+                    if next_el_capacity == 1:  # Nächstes Element hat Kapazität = 1
+                        # 1. Reserviere alle Elemente bis zur nächsten Entlastung
+                        next_highcap_idx = finde_naechste_knoten_mit_mehr_kapazitaet(i)
                     
-                    # Reservierung durchführen
-                    yield from versuche_reservierung(zid, i, next_highcap_idx)
+                        # Warte, bis Reservierung möglich
+                        waiting_reported = False
+                        while not kapazitaet_frei_oder_selbst_reserviert(i, next_highcap_idx):
+                            if not waiting_reported:
+                                update_zugstatus(
+                                    current_element=current, 
+                                    action="waiting", 
+                                    status="wartet", 
+                                    breaktime_info="Wartet auf freie Kapazitaet"
+                                )
+                                waiting_reported = True
+                            yield from warte_auf_freigabe(i, next_highcap_idx)
                     
-                    # 2. Fahrzeitprofil nach Halt/Durchfahrt wählen
-                    stop_key = f"remaining_time_{'stop0' if next_stop else 'stopV'}"
-                    breaktime_value = bt.get(stop_key, 0)
-                    direction = "forward" if forward_phys else "backward"
+                        # Reservierung durchführen
+                        yield from versuche_reservierung(zid, i, next_highcap_idx)
                     
-                    update_zugstatus(
-                        current_element=current, 
-                        action="braking", 
-                        status="in Fahrt", 
-                        breaktime_info=f"{stop_key} ({direction}): {breaktime_value:.1f}s fuer {next_el} (Engstelle)"
-                    )
-                    yield env.timeout(breaktime_value)
-                
-                else:  # Nächstes Element hat Kapazität > 1
-                    # 1. Prüfe ob der Zug hält
-                    if next_stop:  # Zug hält im nächsten Element
-                        # Verwende stop0-Profil
-                        stop_key = "remaining_time_stop0"
-                        breaktime_value = bt.get(stop_key, 0)
+                        # 2. Fahrzeitprofil nach Halt/Durchfahrt wählen
+                        stop_key = f"remaining_time_{'stop0' if next_stop else 'stopV'}"
+                        breaktime_value = bt.get(stop_key, 0) * fahrzeitfaktor
                         direction = "forward" if forward_phys else "backward"
-                        
+                    
                         update_zugstatus(
                             current_element=current, 
                             action="braking", 
                             status="in Fahrt", 
-                            breaktime_info=f"{stop_key} ({direction}): {breaktime_value:.1f}s fuer {next_el} (Entlastung)"
+                            breaktime_info=f"{stop_key} ({direction}): {breaktime_value:.1f}s fuer {next_el} (Engstelle)"
                         )
                         yield env.timeout(breaktime_value)
+                
+                    else:  # Nächstes Element hat Kapazität > 1
+                        # 1. Prüfe ob der Zug hält
+                        if next_stop:  # Zug hält im nächsten Element
+                            # Verwende stop0-Profil
+                            stop_key = "remaining_time_stop0"
+                            breaktime_value = bt.get(stop_key, 0) * fahrzeitfaktor
+                            direction = "forward" if forward_phys else "backward"
+                        
+                            update_zugstatus(
+                                current_element=current, 
+                                action="braking", 
+                                status="in Fahrt", 
+                                breaktime_info=f"{stop_key} ({direction}): {breaktime_value:.1f}s fuer {next_el} (Entlastung)"
+                            )
+                            yield env.timeout(breaktime_value)
                     
-                    else:  # Zug fährt durch
-                        # Reserviere ab dem übernächsten Element bis zur nächsten Entlastung
-                        if i+2 < len(route_used):
-                            next_next_el_idx = i+2
-                            next_highcap_idx = len(route_used) - 1  # Standard: Ende der Route
+                        else:  # Zug fährt durch
+                            # Reserviere ab dem übernächsten Element bis zur nächsten Entlastung
+                            if i+2 < len(route_used):
+                                next_highcap_idx = finde_naechste_knoten_mit_mehr_kapazitaet(i+1)
                             
-                            for j in range(next_next_el_idx, len(route_used)):
-                                k = route_used[j]
-                                if infra_yaml[k]["normal_capacity"] > 1:
-                                    next_highcap_idx = j
-                                    break
+                                # Warte, bis Reservierung möglich (ab dem übernächsten Element)
+                                waiting_reported = False
+                                while not kapazitaet_frei_oder_selbst_reserviert(i+1, next_highcap_idx):
+                                    if not waiting_reported:
+                                        update_zugstatus(
+                                            current_element=current, 
+                                            action="waiting", 
+                                            status="wartet", 
+                                            breaktime_info="Wartet auf freie Kapazitaet (nach Entlastung)"
+                                        )
+                                        waiting_reported = True
+                                    yield from warte_auf_freigabe(i+1, next_highcap_idx)
                             
-                            # Warte, bis Reservierung möglich (ab dem übernächsten Element)
-                            waiting_reported = False
-                            while not kapazitaet_frei_oder_selbst_reserviert(i+1, next_highcap_idx):
-                                if not waiting_reported:
-                                    update_zugstatus(
-                                        current_element=current, 
-                                        action="waiting", 
-                                        status="wartet", 
-                                        breaktime_info="Wartet auf freie Kapazitaet (nach Entlastung)"
-                                    )
-                                    waiting_reported = True
-                                yield env.timeout(1)
-                            
-                            # Reservierung durchführen (ab übernächstem Element)
-                            yield from versuche_reservierung(zid, i+1, next_highcap_idx)
+                                # Reservierung durchführen (ab übernächstem Element)
+                                yield from versuche_reservierung(zid, i+1, next_highcap_idx)
                         
-                        # Verwende stopV-Profil fuer Durchfahrt
-                        stop_key = "remaining_time_stopV"
-                        breaktime_value = bt.get(stop_key, 0)
-                        direction = "forward" if forward_phys else "backward"
+                            # Verwende stopV-Profil fuer Durchfahrt
+                            stop_key = "remaining_time_stopV"
+                            breaktime_value = bt.get(stop_key, 0) * fahrzeitfaktor
+                            direction = "forward" if forward_phys else "backward"
                         
-                        update_zugstatus(
-                            current_element=current, 
-                            action="braking", 
-                            status="in Fahrt", 
-                            breaktime_info=f"{stop_key} ({direction}): {breaktime_value:.1f}s fuer {next_el} (Durchfahrt)"
-                        )
-                        yield env.timeout(breaktime_value)
+                            update_zugstatus(
+                                current_element=current, 
+                                action="braking", 
+                                status="in Fahrt", 
+                                breaktime_info=f"{stop_key} ({direction}): {breaktime_value:.1f}s fuer {next_el} (Durchfahrt)"
+                            )
+                            yield env.timeout(breaktime_value)
 
-        # Endstation separat behandeln
-        prev = route_used[-2]
-        end = route_used[-1]
+            # Endstation separat behandeln
+            prev = route_used[-2]
+            end = route_used[-1]
         
-        # Freigabe des vorletzten Elements
-        for req in list(infra[prev].res.users):
-            if req.proc==env.active_process:
-                infra[prev].res.release(req)
-                update_zugstatus(prev, "release")
-
-        # Ankunft an der Endstation
-        update_zugstatus(
-            current_element=end, 
-            action="start", 
-            status="in Fahrt", 
-            breaktime_info=""  # Keine Breaktime bei der finalen Einfahrt
-        )
-        
-        # Eventueller Halt an der Endstation
-        if end in stops:
+            # Freigabe des vorletzten Elements
+            gib_frei(prev)
+
+            # Ankunft an der Endstation
             update_zugstatus(
                 current_element=end, 
-                action="stop", 
-                status="Halt", 
-                breaktime_info=f"Planmaessiger Halt fuer {stops[end]:.1f}s"
+                action="start", 
+                status="in Fahrt", 
+                breaktime_info=""  # Keine Breaktime bei der finalen Einfahrt
+            )
+        
+            # Eventueller Halt an der Endstation
+            if end in stops:
+                update_zugstatus(
+                    current_element=end, 
+                    action="stop", 
+                    status="Halt", 
+                    breaktime_info=f"Planmaessiger Halt fuer {stops[end]:.1f}s"
+                )
+                yield env.timeout(stops[end])
+
+            update_zugstatus(
+                current_element=arrival_station, 
+                action="arrival", 
+                status="angekommen", 
+                breaktime_info=""
             )
-            yield env.timeout(stops[end])
-
-        update_zugstatus(
-            current_element=arrival_station, 
-            action="arrival", 
-            status="angekommen", 
-            breaktime_info=""
-        )
-
-        # Rückfahrt wenn verhalten="return"
-        if verhalten=="return":
-            yield from simulate_direction(arrival_station, depart_station)
-        else:
-            # Wenn der Zug seinen Lauf beendet hat, entferne ihn aus dem zugstatus
-            if zid in zugstatus:
-                del zugstatus[zid]
-
-    # Starte Simulation
-    yield from simulate_direction(depart_station, arrival_station)
-
-# Status-Manager vor dem Start der eigentlichen Simulation starten
-# Damit wird der Anfangszustand bei t=0 garantiert ausgegeben
-process_status = env.process(status_ausgabe(env))
-
-# Prozesse starten
-for zug in timetable_data:
-    # Initialisiere Zugstatus bereits hier vor dem Start der Simulation
-    zid = zug["train_id"]
-    idx_depart = route.index(zug["depart"]["station"])
-    idx_arrival = route.index(zug["arrival"]["station"])
-    is_forward = idx_depart < idx_arrival
+
+            # Rückfahrt wenn verhalten="return", solange Rückfahrten offen sind
+            if verhalten=="return" and (rueckfahrten is None or fahrt_nr < rueckfahrten):
+                yield from simulate_direction(arrival_station, depart_station, fahrt_nr + 1)
+            else:
+                # Wenn der Zug seinen Lauf beendet hat, gibt er seine Reservierungen
+                # (die Endstation) frei und wird aus dem zugstatus entfernt
+                if zid in zugstatus:
+                    for element in list(eigene):
+                        gib_frei(element)
+                    del zugstatus[zid]
+                    protokoll.beende(env.now, zid)
+
+        # Starte Simulation
+        yield from simulate_direction(depart_station, arrival_station)
+
+        # Letzter Zug fertig: Lauf beenden, statt bis zum Horizont weiterzuzählen
+        self.laufende_zuege -= 1
+        if self.bis_alle_fertig and self.laufende_zuege == 0 and not self.abbruch.triggered:
+            self.abbruch.succeed()
+
+    def starte_zuege(self):
+        """Initialisiert den Zugstatus aller Züge des Fahrplans und startet ihre Prozesse"""
+        env, zugstatus, protokoll, route = self.env, self.zugstatus, self.protokoll, self.route
+        for zug in self.timetable:
+            # Initialisiere Zugstatus bereits hier vor dem Start der Simulation
+            zid = zug["train_id"]
+            idx_depart = route.index(zug["depart"]["station"])
+            idx_arrival = route.index(zug["arrival"]["station"])
+            is_forward = idx_depart < idx_arrival
     
-    # Überprüfe auf occupied_before_start Parameter
-    occupied_before_start = zug["depart"].get("occupied_before_start", 0)
-    early_reservation_info = ""
-    if occupied_before_start > 0:
-        early_reservation_info = f", Vorreservierung {occupied_before_start}s vor Abfahrt"
+            # Überprüfe auf occupied_before_start Parameter
+            occupied_before_start = zug["depart"].get("occupied_before_start", 0)
+            early_reservation_info = ""
+            if occupied_before_start > 0:
+                early_reservation_info = f", Vorreservierung {occupied_before_start}s vor Abfahrt"
     
-    zugstatus[zid] = {
-        "element": zug["depart"]["station"], 
-        "reserved": [], 
-        "status": "geplant",  # Neuer Status "geplant" fuer Züge vor Abfahrt
-        "breaktime_info": f"Geplante Abfahrt bei {zug['depart']['time']}s{early_reservation_info}",
-        "is_forward": is_forward  # Speichere die Bewegungsrichtung
-    }
+            zugstatus[zid] = {
+                "element": zug["depart"]["station"], 
+                "reserved": [], 
+                "status": "geplant",  # Neuer Status "geplant" fuer Züge vor Abfahrt
+                "breaktime_info": f"Geplante Abfahrt bei {zug['depart']['time']}s{early_reservation_info}",
+                "is_forward": is_forward  # Speichere die Bewegungsrichtung
+            }
+            protokoll.melde(env.now, zid, zugstatus[zid])
     
-    # Starte den Zugprozess
-    env.process(zugfahrt(env, zug))
-
-# Simulation ausführen
-print(f"Starte Simulation fuer {max_sim_time} Sekunden mit Log-Intervall {log_schritte}s...")
-env.run(until=max_sim_time)
-print("Simulation abgeschlossen.")
-
-# Log ins JSON-Verzeichnis schreiben
-with open("json/simulation_log.json", "w") as f:
-    json.dump(status_log, f, indent=2)
-print(f"Log gespeichert in json/simulation_log.json ({len(status_log)} Statuseinträge)")
-print("Struktur: Liste von Einträgen [Zeit, Zuginfos, ...] analog zur vorherigen Terminalausgabe.")
\ No newline at end of file
+            # Starte den Zugprozess
+            env.process(self.zugfahrt(zug))
+            self.laufende_zuege += 1
+
+    def fuehre_aus(self, horizont):
+        """Lässt die Simulation bis horizont laufen (bzw. bis alle Züge fertig sind) und schließt die Senken"""
+        # Status-Manager vor dem Start der eigentlichen Simulation starten
+        # Damit wird der Anfangszustand bei t=0 garantiert ausgegeben
+        # Ohne Terminal-Ausgabe wird der Prozess gar nicht erst gestartet
+        if self.konsolenausgabe:
+            self.env.process(self.status_ausgabe())
+        try:
+            self.starte_zuege()
+            with messung.stufe("env.run"):
+                self.env.run(until=horizont)
+        finally:
+            # Auch bei einer Ausnahme im Lauf: Puffer schreiben und .gz-Datei sauber abschließen
+            self.protokoll.schliesse()
+        return Simulationsergebnis(horizont, self.env.now, self.zugstatus, self.protokoll.senken, self.deadlock,
+                                   self.laufende_zuege == 0, self.schritte)
+
+@messung.gemessen
+def fuehre_simulation_aus(infra_data, timetable, breaktimes, horizont=max_sim_time, senken=None,
+                          konsolenausgabe=False, log_schritte=1, deadlock_erkennung=deadlock_erkennung,
+                          bis_alle_fertig=bis_alle_fertig):
+    """Ein vollständiger Simulationslauf ohne globalen Zustand.
+
+    infra_data wie 1_Infrastruktur.yaml, timetable wie "timetable" in 3_Fahrplan.yaml,
+    breaktimes wie json/breaktimes.json. senken: Liste von Log-Senken aus simulationslog.py
+    (Standard: eine ListenSenke). Rückgabe: Simulationsergebnis; blockieren sich Züge
+    gegenseitig, endet der Lauf mit deadlock_erkennung sofort und ergebnis.deadlock enthält
+    den Bericht. Mit bis_alle_fertig endet der Lauf, sobald der letzte Zug fertig ist.
+    """
+    with messung.stufe("aufbau"):
+        simulation = Simulation(infra_data, timetable, breaktimes, senken, konsolenausgabe, log_schritte,
+                                deadlock_erkennung, bis_alle_fertig)
+    return simulation.fuehre_aus(horizont)
+
+if __name__ == "__main__":
+    infra_data, timetable_data, breaktimes = lade_eingaben(breaktimes_aus_pipeline=breaktimes_im_speicher)
+    senke = erzeuge_senke(log_senke, log_datei if log_senke == "datei" else None)
+
+    # Simulation ausführen
+    if konsolenausgabe:
+        print(f"Starte Simulation fuer {max_sim_time} Sekunden mit Log-Intervall {log_schritte}s...")
+    ergebnis = fuehre_simulation_aus(infra_data, timetable_data, breaktimes, max_sim_time, [senke],
+                                     konsolenausgabe, log_schritte)
+    if konsolenausgabe:
+        grund = "alle Züge fertig" if ergebnis.alle_fertig else "Deadlock" if ergebnis.deadlock else "Horizont erreicht"
+        print(f"Simulation abgeschlossen bei {ergebnis.zeit:.1f}s ({grund}).")
+
+    # Deadlock-Bericht ablegen
+    if ergebnis.deadlock:
+        with open("json/deadlock.json", "w") as f:
+            json.dump(ergebnis.deadlock, f, indent=2, ensure_ascii=False)
+        print(f"⛔ Deadlock bei {ergebnis.deadlock['zeit']:.1f}s zwischen {', '.join(ergebnis.deadlock['zuege'])} "
+              f"→ json/deadlock.json")
+
+    # Log ins JSON-Verzeichnis schreiben
+    if log_senke == "liste":
+        with open("json/simulation_log.json", "w") as f:
+            json.dump(senke.ereignisse, f)
+        if konsolenausgabe:
+            print(f"Log gespeichert in json/simulation_log.json ({len(senke.ereignisse)} Ereignisse)")
+            print("Struktur: ein Eintrag je Änderung eines Zuges; Zustand zur Zeit t über simulationslog.rekonstruiere().")
+    elif log_senke == "datei" and konsolenausgabe:
+        print(f"Log laufend geschrieben in {senke.pfad}")
+    elif log_senke == "zaehler" and konsolenausgabe:
+        print(f"Zusammenfassung: {json.dumps(senke.zusammenfassung(), ensure_ascii=False)}")
@@ -2,13 +2,15 @@ import pygame
 import yaml
 import os
 import sys
-import json
 import time as time_module
 import random
+from bisect import bisect_right
 from collections import defaultdict
+import messung
+import simulationslog
 
 class InfrastructureVisualizer:
-    def __init__(self, infra_path="1_Infrastruktur.yaml", sim_log_path="json/simulation_log.json"):
+    def __init__(self, infra_path="1_Infrastruktur.yaml", sim_log_path="json/simulation_log.jsonl"):
         pygame.init()
 
         self.element_occupancy_times = defaultdict(float)
@@ -54,6 +56,12 @@ class InfrastructureVisualizer:
         self.simulation_data = []
         self.speed_factor = 1
 
+        # Zeitindex über die Schnappschüsse, einmal beim Laden aufgebaut
+        self.snapshot_times = []
+        self.snapshot_reservations = []
+        self.snapshot_trains = []
+        self.completed_index = 0  # Schnappschüsse bis hier sind in completed_trains gezählt
+
         self.train_segments = {}
 
         self.infra_path = infra_path
@@ -105,6 +113,7 @@ class InfrastructureVisualizer:
         if self.success:
             self._calculate_positions()
             self._load_simulation_data()
+            self._build_time_index()
             self._create_train_segments()
             self._calculate_element_occupancy()
             self._calculate_total_track_length()
@@ -114,6 +123,7 @@ class InfrastructureVisualizer:
 
 
 
+    @messung.gemessen
     def _preprocess_delay_data(self):
         """Berechnet vorab alle Verzögerungen aus den Simulationsdaten"""
         print("Vorberechnung der Verzögerungsdaten...")
@@ -173,11 +183,13 @@ class InfrastructureVisualizer:
         self.delay_log = sorted(self.delay_log, key=lambda x: x["start_time"])
         print(f"Vorberechnung abgeschlossen. {len(self.delay_log)} Verzögerungen gefunden.")
 
+    @messung.gemessen
     def _calculate_total_track_length(self):
         """Berechnet die Gesamtlänge aller Streckenabschnitte"""
         self.total_track_length = sum(self.section_lengths.values())
         print(f"Gesamtlänge der Strecke: {self.total_track_length} m")
 
+    @messung.gemessen
     def _assign_train_colors(self):
         """Weist jedem Zug in den Simulationsdaten eine eindeutige Farbe zu."""
         # Sammle alle vorhandenen Zug-IDs
@@ -207,6 +219,7 @@ class InfrastructureVisualizer:
         
         print(f"Farben zugewiesen für {len(train_ids)} Züge")
 
+    @messung.gemessen
     def _calculate_element_occupancy(self):
         """Berechnet die Belegungszeit jedes Elements während der gesamten Simulation."""
         # Berechne die Gesamtzeit der Simulation
@@ -239,6 +252,7 @@ class InfrastructureVisualizer:
             occ_percent = (occ_time / self.total_simulation_time * 100) / capacity
             print(f"  {element}: {occ_time:.1f}s ({occ_percent:.1f}% bei Kapazität {capacity})")
 
+    @messung.gemessen
     def _load_infrastructure(self):
         try:
             with open(self.infra_path, 'r') as f:
@@ -259,6 +273,7 @@ class InfrastructureVisualizer:
             print(f"Fehler beim Laden der Infrastruktur: {e}")
             return False
 
+    @messung.gemessen
     def _calculate_positions(self):
         margin = 50
         track_y = self.height // 2
@@ -285,15 +300,16 @@ class InfrastructureVisualizer:
                     'y': track_y
                 }
 
+    @messung.gemessen
     def _load_simulation_data(self):
         try:
-            with open(self.sim_log_path, 'r') as f:
-                self.simulation_data = json.load(f)
-                # Speichere Startstation jedes Zuges
-                for time_data in self.simulation_data:
-                    for train_id, train_info in time_data.get("trains", {}).items():
-                        if train_id not in self.train_start_locations:
-                            self.train_start_locations[train_id] = train_info.get("element")
+            # Ereignisprotokoll als Schnappschüsse, je einer pro Zeitpunkt mit Änderungen
+            self.simulation_data = simulationslog.lade_schnappschuesse(self.sim_log_path)
+            # Speichere Startstation jedes Zuges
+            for time_data in self.simulation_data:
+                for train_id, train_info in time_data.get("trains", {}).items():
+                    if train_id not in self.train_start_locations:
+                        self.train_start_locations[train_id] = train_info.get("element")
 
             print(f"Simulationsdaten geladen: {len(self.simulation_data)} Zeitpunkte")
             
@@ -305,6 +321,7 @@ class InfrastructureVisualizer:
             print(f"Fehler beim Laden der Simulationsdaten: {e}")
             return False
 
+    @messung.gemessen
     def _create_train_segments(self):
         train_timeline = {}
         for time_data in self.simulation_data:
@@ -340,43 +357,46 @@ class InfrastructureVisualizer:
                     "end_station": end["element"]
                 })
 
-    def get_current_reservations(self, sim_time):
-        reservations = defaultdict(list)
-        # Finde den Eintrag mit genau diesem Zeitpunkt oder den nächstgelegenen
-        closest_time_data = None
-        closest_time_diff = float('inf')
-        
+    @messung.gemessen
+    def _build_time_index(self):
+        """Sortierte Zeitachse und je Schnappschuss die Reservierungen und aktiven Züge.
+
+        Aufeinanderfolgende Schnappschüsse mit gleichen Reservierungen teilen sich ein Dict.
+        """
+        self.simulation_data.sort(key=lambda x: x["time"])
+        self.snapshot_times = [time_data["time"] for time_data in self.simulation_data]
+        self.snapshot_reservations = []
+        self.snapshot_trains = []
+        previous = None
         for time_data in self.simulation_data:
-            time_diff = abs(time_data["time"] - sim_time)
-            if time_diff < closest_time_diff:
-                closest_time_diff = time_diff
-                closest_time_data = time_data
-        
-        if closest_time_data:
-            for train_id, train_info in closest_time_data["trains"].items():
+            reservations = {}
+            for train_id, train_info in time_data["trains"].items():
                 for element in train_info.get("reserved", []):
-                    reservations[element].append(train_id)
-                    
-        return reservations
+                    reservations.setdefault(element, []).append(train_id)
+            if reservations == previous:
+                reservations = previous
+            self.snapshot_reservations.append(reservations)
+            self.snapshot_trains.append(frozenset(time_data["trains"]))
+            previous = reservations
+
+    def _snapshot_index(self, sim_time):
+        """Index des letzten Schnappschusses mit Zeit <= sim_time (vor dem ersten: 0), None ohne Daten.
+
+        Schnappschüsse sind Änderungszeitpunkte, jeder gilt bis zum nächsten.
+        """
+        if not self.snapshot_times:
+            return None
+        return max(bisect_right(self.snapshot_times, sim_time) - 1, 0)
+
+    def get_current_reservations(self, sim_time):
+        """Reservierungen {element: [train_id, ...]} zum Zeitpunkt sim_time (nur lesen, wird geteilt)"""
+        i = self._snapshot_index(sim_time)
+        return self.snapshot_reservations[i] if i is not None else {}
     
     def get_active_trains_at_time(self, sim_time):
         """Gibt eine Liste der aktiven Züge zu einem bestimmten Zeitpunkt zurück"""
-        active_trains = set()
-        
-        # Finde den Eintrag mit genau diesem Zeitpunkt oder den nächstgelegenen
-        closest_time_data = None
-        closest_time_diff = float('inf')
-        
-        for time_data in self.simulation_data:
-            time_diff = abs(time_data["time"] - sim_time)
-            if time_diff < closest_time_diff:
-                closest_time_diff = time_diff
-                closest_time_data = time_data
-        
-        if closest_time_data:
-            active_trains = set(closest_time_data["trains"].keys())
-                    
-        return active_trains
+        i = self._snapshot_index(sim_time)
+        return self.snapshot_trains[i] if i is not None else set()
     
     def check_for_current_delays(self, sim_time):
         """Identifiziert aktuell wartende Züge zum angegebenen Zeitpunkt"""
@@ -665,9 +685,12 @@ class InfrastructureVisualizer:
 
 
     def _update_completed_trains(self):
-        for time_data in self.simulation_data:
-            if time_data["time"] > self.simulation_time:
-                break
+        # Nur die seit dem letzten Bild hinzugekommenen Schnappschüsse; bereits gezählte Züge
+        # bleiben auch nach einem Neustart gezählt, daher läuft der Index nie zurück
+        while (self.completed_index < len(self.simulation_data)
+               and self.simulation_data[self.completed_index]["time"] <= self.simulation_time):
+            time_data = self.simulation_data[self.completed_index]
+            self.completed_index += 1
 
             for train_id, train_info in time_data["trains"].items():
                 if train_id in self.trains_seen_at_destination:
@@ -753,14 +776,16 @@ class InfrastructureVisualizer:
 
 def main():
     infra_path = "1_Infrastruktur.yaml"
-    sim_log_path = "json/simulation_log.json"
 
     if not os.path.exists(infra_path):
         print(f"Die Datei {infra_path} wurde nicht gefunden.")
         return
 
-    if not os.path.exists(sim_log_path):
-        print(f"Die Datei {sim_log_path} wurde nicht gefunden.")
+    # Zuletzt geschriebenes Log: .jsonl(.gz) aus laufendem Schreiben oder .json
+    try:
+        sim_log_path = simulationslog.finde_log("json")
+    except FileNotFoundError as e:
+        print(e)
         return
 
     visualizer = InfrastructureVisualizer(infra_path, sim_log_path)
@@ -0,0 +1,98 @@
+"""Inhaltsadressierter Cache für abgeleitete Artefakte (Fahrprofile, Breakpoints).
+
+Der Schlüssel ist ein Hash über die exakten Eingaben eines Artefakts. Geänderte Eingaben
+ergeben einen neuen Schlüssel, daher wird nie invalidiert, sondern nur verdrängt: Überschreitet
+der Cache max_bytes, werden die am längsten nicht genutzten Einträge gelöscht, bis er wieder
+unter dem Füllstand nach dem Aufräumen liegt. Die Größe wird beim Ablegen mitgezählt; der
+Ordner wird nur beim Öffnen und beim Aufräumen durchsucht.
+"""
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+
+# Einstellungen
+fuellstand_nach_aufraeumen = 0.9  # Anteil von max_bytes, bis zu dem verdrängt wird
+
+def _serialisierbar(objekt):
+    if isinstance(objekt, np.ndarray):
+        inhalt = hashlib.sha256(np.ascontiguousarray(objekt).tobytes()).hexdigest()
+        return {"ndarray": inhalt, "dtype": str(objekt.dtype), "shape": objekt.shape}
+    if isinstance(objekt, np.generic):
+        return objekt.item()
+    raise TypeError(f"Nicht hashbar: {type(objekt)}")
+
+class ArtefaktCache:
+    def __init__(self, ordner="cache", max_bytes=256 * 1024 ** 2):
+        self.ordner = ordner
+        self.max_bytes = max_bytes
+        self.treffer = 0
+        self.fehlschlaege = 0
+        os.makedirs(ordner, exist_ok=True)
+        self.groesse = sum(e[1] for e in self._eintraege())  # Bytes aller Einträge, beim Ablegen mitgezählt
+
+    @staticmethod
+    def schluessel(*teile):
+        """SHA-256 über die JSON-Darstellung der Eingaben (Arrays über ihren Inhalt)"""
+        text = json.dumps(teile, sort_keys=True, default=_serialisierbar)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _pfad(self, schluessel):
+        return os.path.join(self.ordner, f"{schluessel}.pkl")
+
+    def hole(self, schluessel):
+        pfad = self._pfad(schluessel)
+        try:
+            with open(pfad, "rb") as f:
+                wert = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.fehlschlaege += 1
+            return None
+        os.utime(pfad)  # Zugriffszeit für die Verdrängung
+        self.treffer += 1
+        return wert
+
+    def lege_ab(self, schluessel, wert):
+        pfad = self._pfad(schluessel)
+        tmp = f"{pfad}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(wert, f, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            self.groesse -= os.path.getsize(pfad)  # überschriebener Eintrag
+        except FileNotFoundError:
+            pass
+        self.groesse += os.path.getsize(tmp)
+        os.replace(tmp, pfad)
+        if self.groesse > self.max_bytes:
+            self.raeume_auf()
+
+    def _eintraege(self):
+        """(mtime, Bytes, Name) aller Einträge im Ordner"""
+        eintraege = []
+        for name in os.listdir(self.ordner):
+            if name.endswith(".pkl"):
+                try:
+                    stat = os.stat(os.path.join(self.ordner, name))
+                except FileNotFoundError:  # von einem anderen Prozess verdrängt
+                    continue
+                eintraege.append((stat.st_mtime, stat.st_size, name))
+        return eintraege
+
+    def raeume_auf(self):
+        """Verdrängt die ältesten Einträge, bis der Cache unter fuellstand_nach_aufraeumen · max_bytes liegt.
+
+        Zählt die Größe dabei neu, so gleichen sich auch Einträge anderer Prozesse aus.
+        """
+        eintraege = self._eintraege()
+        self.groesse = sum(e[1] for e in eintraege)
+        if self.groesse <= self.max_bytes:
+            return
+        for _, bytes_, name in sorted(eintraege):
+            if self.groesse <= fuellstand_nach_aufraeumen * self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.ordner, name))
+            except FileNotFoundError:
+                pass
+            self.groesse -= bytes_
@@ -0,0 +1,233 @@
+"""Skalierungs-Benchmark mit synthetischen Strecken und Fahrplänen.
+
+Je Fall wird eine Strecke im Format von 1_Infrastruktur.yaml und 2_Vprofil.yaml erzeugt
+(abwechselnd Stationen B1, B2, ... und Abschnitte S1, S2, ... mit gemischten Kapazitäten)
+und ein Taktfahrplan mit der gewünschten Zugzahl. Gemessen werden
+Laufzeit und Spitzenspeicher jeder Stufe, bei der Simulation zusätzlich abgearbeitete
+SimPy-Ereignisse pro Sekunde, daneben geschriebene Log-Ereignisse pro Sekunde und Loggröße. Die Aufbereitung im
+Visualizer braucht pygame und wird ohne pygame oder bei Logs über
+visualisierung_max_ereignisse übersprungen; das steht dann mit Grund in Ausgabe und JSON.
+Die Ergebnisse landen mit Versionsangaben als JSON in benchmark/ und lassen sich mit
+vergleiche() gegen einen früheren Lauf halten.
+
+Standardmäßig fahren alle Züge in eine Richtung: mit Gegenverkehr laufen die Züge auf der
+eingleisigen Strecke schon bei wenigen Zügen in eine gegenseitige Blockade, und die
+Simulation misst dann kaum noch Arbeit.
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import yaml
+import simulationslog
+from taktfahrplan import erzeuge_taktfahrplan
+
+streckenabschnitte = importlib.import_module("4_streckenabschnitte")
+fahrprofile = importlib.import_module("5_Fahrprofile")
+bremspunkte = importlib.import_module("6_Bremspunkte")
+simulation = importlib.import_module("7_simulation")
+
+# Einstellungen
+stufe = "klein"  # "klein" für einen schnellen Überblick, "voll" für den gesamten Bereich
+faelle = {
+    "klein": [(11, 10), (101, 100), (101, 1000), (1001, 100)],
+    "voll": [(11, 10), (101, 100), (101, 1000), (101, 5000), (1001, 100), (1001, 1000), (1001, 5000)]
+}  # (Elemente der Strecke, Züge)
+seed = 1
+speicher_messen = True  # zweiter Durchlauf je Stufe mit tracemalloc für den Spitzenspeicher
+takt = 300              # Abstand der Abfahrten je Richtung in s
+gegenrichtung = False   # True: Züge je zur Hälfte in beiden Richtungen (Blockaden möglich)
+ausgabe_ordner = "benchmark"
+vergleich_mit = None    # Pfad eines früheren Ergebnisses für vergleiche()
+visualisierung_max_ereignisse = 200_000  # größere Logs passen als Schnappschüsse nicht in den Speicher
+
+def erzeuge_strecke(elemente, seed=seed):
+    """Synthetische Infrastruktur und v_profile: (infra_data, vprofile_data)"""
+    rng = np.random.default_rng(seed)
+    elemente = max(3, elemente | 1)  # ungerade: Station am Anfang und am Ende
+    route, infrastructure = [], {}
+    for i in range(elemente):
+        if i % 2 == 0:
+            name = f"B{i // 2 + 1}"
+            endstation = i in (0, elemente - 1)
+            kapazitaet = 10 if endstation else int(rng.choice([1, 2, 2, 3]))
+            infrastructure[name] = {"type": "station", "normal_capacity": kapazitaet}
+        else:
+            name = f"S{i // 2 + 1}"
+            infrastructure[name] = {
+                "type": "section",
+                "normal_capacity": int(rng.choice([1, 1, 1, 2])),
+                "length": int(rng.integers(1500, 4000))
+            }
+        route.append(name)
+
+    gesamt = sum(e["length"] for e in infrastructure.values() if e["type"] == "section")
+    segmente = []
+    while gesamt > 0:
+        laenge = min(gesamt, int(rng.integers(300, 3000)))
+        segmente.append({"length": laenge, "v": int(rng.choice([60, 80, 100, 120]))})
+        gesamt -= laenge
+    return {"route": route, "infrastructure": infrastructure}, {"v_profile": [{"v_segment": segmente}]}
+
+def erzeuge_fahrplan(infra_data, zuege, takt=takt, gegenrichtung=gegenrichtung):
+    """Taktfahrplan mit zuege Zügen und Halt an jeder Station, bei gegenrichtung je zur Hälfte in beiden Richtungen"""
+    route = infra_data["route"]
+    stationen = [e for e in route if infra_data["infrastructure"][e]["type"] == "station"]
+    je_richtung = [(zuege + 1) // 2, zuege // 2] if gegenrichtung else [zuege, 0]
+    linien = [
+        {"linie": name, "von": von, "nach": nach, "takt": takt, "beginn": 0, "ende": anzahl * takt,
+         "halte": stationen, "haltezeit": 30, "wende": "terminate"}
+        for name, von, nach, anzahl in (("H", route[0], route[-1], je_richtung[0]),
+                                        ("R", route[-1], route[0], je_richtung[1]))
+        if anzahl > 0
+    ]
+    return erzeuge_taktfahrplan(linien, route)
+
+def miss(funktion, speicher=speicher_messen):
+    """Führt funktion aus; Rückgabe (Ergebnis, Sekunden, Spitzenspeicher in Bytes oder None)"""
+    start = time.perf_counter()
+    ergebnis = funktion()
+    sekunden = time.perf_counter() - start
+    spitze = None
+    if speicher:
+        tracemalloc.start()
+        funktion()
+        spitze = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return ergebnis, sekunden, spitze
+
+def _eintrag(sekunden, spitze, **werte):
+    return {"sekunden": round(sekunden, 4), "spitzenspeicher_bytes": spitze, **werte}
+
+def messe_fall(elemente, zuege, ordner, seed=seed):
+    """Alle Stufen für einen Fall; Rückgabe {stufe: Messwerte}"""
+    infra_data, vprofile_data = erzeuge_strecke(elemente, seed)
+    route = infra_data["route"]
+    infrastructure = infra_data["infrastructure"]
+    v_segments = vprofile_data["v_profile"][0]["v_segment"]
+    stufen = {}
+
+    abschnitte, s, m = miss(lambda: streckenabschnitte.teile_streckenabschnitte(route, infrastructure, v_segments))
+    stufen["4_streckenabschnitte"] = _eintrag(s, m, abschnitte=len(abschnitte))
+
+    profile, s, m = miss(lambda: fahrprofile.erzeuge_fahrprofile(abschnitte, fahrprofile.beschleunigen, fahrprofile.bremsen))
+    punkte = sum(len(p["Zeit [s]"]) for p in profile.values())
+    stufen["5_fahrprofile"] = _eintrag(s, m, profile=len(profile), profilpunkte=punkte)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Konsistenzwarnungen unterdrücken
+        breaktimes, s, m = miss(lambda: bremspunkte.berechne_breaktimes(profile, list(abschnitte)))
+    stufen["6_bremspunkte"] = _eintrag(s, m, abschnitte=len(breaktimes))
+
+    # Horizont: Abfahrtsfenster plus großzügige Fahrzeit über die ganze Strecke
+    timetable = erzeuge_fahrplan(infra_data, zuege)
+    fahrzeit = sum(bt["forward"]["time_at_breakpoint_start0"] + bt["forward"]["remaining_time_stop0"]
+                   for bt in breaktimes.values())
+    horizont = max(z["depart"]["time"] for z in timetable) + 3 * (fahrzeit + 30 * len(route))
+
+    log_pfad = os.path.join(ordner, f"log_{elemente}_{zuege}.jsonl")
+    def simuliere():
+        senken = [simulationslog.DateiSenke(log_pfad), simulationslog.ZaehlerSenke()]
+        return simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, horizont, senken)
+    ergebnis, s, m = miss(simuliere)
+    zaehler = ergebnis.senke(simulationslog.ZaehlerSenke).zusammenfassung()
+    stufen["7_simulation"] = _eintrag(
+        s, m, zuege=len(timetable), angekommen=zaehler["beendet"], simulierte_zeit=ergebnis.zeit,
+        deadlock_zeit=ergebnis.deadlock["zeit"] if ergebnis.deadlock else None,
+        simulationsereignisse=ergebnis.schritte, simulationsereignisse_pro_s=round(ergebnis.schritte / s, 1),
+        log_ereignisse=zaehler["ereignisse"], log_ereignisse_pro_s=round(zaehler["ereignisse"] / s, 1),
+        log_bytes=os.path.getsize(log_pfad)
+    )
+
+    ereignisse, s, m = miss(lambda: simulationslog.lade(log_pfad))
+    stufen["8_log_laden"] = _eintrag(s, m, ereignisse=len(ereignisse))
+    del ereignisse
+
+    # Schnappschüsse nur zählen, nicht halten: ihr Speicher wächst mit Ereignissen × Zügen
+    anzahl, s, m = miss(lambda: sum(1 for _ in simulationslog.iter_schnappschuesse(simulationslog.lies_ereignisse(log_pfad))))
+    stufen["8_schnappschuesse"] = _eintrag(s, m, schnappschuesse=anzahl)
+
+    if zaehler["ereignisse"] > visualisierung_max_ereignisse:
+        stufen["8_visualisierung"] = {"uebersprungen": f"{zaehler['ereignisse']} Ereignisse > {visualisierung_max_ereignisse}"}
+    else:
+        stufen["8_visualisierung"] = messe_visualisierung(infra_data, log_pfad, ordner)
+    return stufen
+
+def messe_visualisierung(infra_data, log_pfad, ordner):
+    """Aufbereitung im Visualizer (ohne Fenster); übersprungen, wenn pygame fehlt"""
+    try:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        visualisierung = importlib.import_module("8_visualisierung")
+    except ImportError as e:
+        return {"uebersprungen": str(e)}
+    infra_pfad = os.path.join(ordner, "infrastruktur.yaml")
+    with open(infra_pfad, "w") as f:
+        yaml.safe_dump(infra_data, f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, s, m = miss(lambda: visualisierung.InfrastructureVisualizer(infra_pfad, log_pfad))
+    return _eintrag(s, m)
+
+def versionsangaben():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "zeitpunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plattform": platform.platform()
+    }
+
+def fuehre_benchmark_aus(faelle, seed=seed):
+    """Misst alle Fälle; Rückgabe mit Versionsangaben, je Fall {"elemente", "zuege", "stufen"}"""
+    ergebnisse = []
+    with tempfile.TemporaryDirectory() as ordner:
+        for elemente, zuege in faelle:
+            stufen = messe_fall(elemente, zuege, ordner, seed)
+            ergebnisse.append({"elemente": elemente, "zuege": zuege, "stufen": stufen})
+            gesamt = sum(st.get("sekunden", 0) for st in stufen.values())
+            print(f"⏱️  {elemente:>5} Elemente, {zuege:>5} Züge: {gesamt:8.2f}s "
+                  f"({stufen['7_simulation']['simulationsereignisse_pro_s']:.0f} SimPy-Ereignisse/s, "
+                  f"{stufen['7_simulation']['log_ereignisse_pro_s']:.0f} Log-Ereignisse/s)")
+            for name, werte in stufen.items():
+                if "uebersprungen" in werte:
+                    print(f"   ⚠️ {name} übersprungen, nicht in der Zeit enthalten: {werte['uebersprungen']}")
+    return {"version": versionsangaben(), "seed": seed, "faelle": ergebnisse}
+
+def vergleiche(alt, neu):
+    """Laufzeitverhältnis neu/alt je Fall und Stufe ({"elemente×zuege": {stufe: faktor}})"""
+    alte = {(f["elemente"], f["zuege"]): f["stufen"] for f in alt["faelle"]}
+    vergleich = {}
+    for fall in neu["faelle"]:
+        stufen_alt = alte.get((fall["elemente"], fall["zuege"]))
+        if not stufen_alt:
+            continue
+        vergleich[f"{fall['elemente']}×{fall['zuege']}"] = {
+            stufe: round(werte["sekunden"] / stufen_alt[stufe]["sekunden"], 3)
+            for stufe, werte in fall["stufen"].items()
+            if "sekunden" in werte and stufen_alt.get(stufe, {}).get("sekunden")
+        }
+    return vergleich
+
+if __name__ == "__main__":
+    ergebnis = fuehre_benchmark_aus(faelle[stufe])
+
+    os.makedirs(ausgabe_ordner, exist_ok=True)
+    name = f"benchmark_{ergebnis['version']['commit'] or 'ohne_git'}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    pfad = os.path.join(ausgabe_ordner, name)
+    with open(pfad, "w") as f:
+        json.dump(ergebnis, f, indent=2, ensure_ascii=False)
+    print(f"✅ JSON erstellt: {pfad}")
+
+    if vergleich_mit:
+        with open(vergleich_mit) as f:
+            for fall, faktoren in vergleiche(json.load(f), ergebnis).items():
+                print(f"  {fall}: " + ", ".join(f"{stufe} ×{faktor}" for stufe, faktor in faktoren.items()))
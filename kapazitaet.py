@@ -0,0 +1,187 @@
+"""Automatische Kapazitätssuche: größte Zugzahl pro Stunde über Bisektion der Zugfolgezeit.
+
+Aus den Zügen in 3_Fahrplan.yaml wird je Fahrtrichtung ein Muster genommen und im Takt
+vervielfältigt (die Züge enden am Ziel). Ein Takt gilt als fahrbar, wenn alle Züge vor
+Ende der Simulation ankommen, kein Zug länger als max_wartezeit an Engstellen wartet und
+die Wartezeiten über das Fahrplanfenster nicht anwachsen. Je Runde werden mehrere
+Kandidaten parallel simuliert; Bewertungen werden über den Hash des Szenarios gecacht.
+"""
+import copy
+import importlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from artefakt_cache import ArtefaktCache
+from simulationslog import KennzahlenSenke
+
+simulation = importlib.import_module("7_simulation")
+
+# Einstellungen
+fenster = 3 * 3600      # Zeitraum in s, in dem die Züge im Takt abfahren
+nachlauf = 3600         # zusätzliche Simulationszeit, damit die letzten Züge ankommen
+takt_min = 60           # Suchbereich der Zugfolgezeit in s
+takt_max = 3600
+genauigkeit = 5         # Suche endet, wenn das Intervall kleiner ist (s)
+max_wartezeit = 120     # größte zulässige Wartezeit eines Zuges in s
+stabilitaet_toleranz = 60  # zulässiger Anstieg der mittleren Wartezeit vom ersten zum letzten Drittel (s)
+gemeinsam = False       # True: beide Richtungen gleichzeitig im selben Takt
+worker = os.cpu_count()
+
+def richtung(zug, route):
+    return "forward" if route.index(zug["depart"]["station"]) < route.index(zug["arrival"]["station"]) else "backward"
+
+def muster_zuege(timetable, route):
+    """Erster Zug je Fahrtrichtung als Muster: {richtung: zug}"""
+    muster = {}
+    for zug in timetable:
+        muster.setdefault(richtung(zug, route), zug)
+    return muster
+
+def erzeuge_fahrplan(muster, takt, fenster=fenster):
+    """Vervielfältigt die Musterzüge im Abstand takt über fenster; die Züge enden am Ziel"""
+    timetable = []
+    anzahl = math.ceil(fenster / takt)
+    for vorlage in muster:
+        start = vorlage["depart"]["time"]
+        for i in range(anzahl):
+            zug = copy.deepcopy(vorlage)
+            zug["train_id"] = f"{vorlage['train_id']}_{i + 1}"
+            zug["behaviour"] = "terminate"
+            zug["depart"]["time"] = start + i * takt
+            timetable.append(zug)
+    return timetable
+
+def bewerte_fahrplan(infra_data, timetable, breaktimes, horizont, kriterien):
+    """Simuliert timetable und prüft die Kriterien; Rückgabe dict mit "fahrbar" und Kennzahlen"""
+    senke = KennzahlenSenke()
+    ergebnis = simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, horizont, [senke])
+    kennzahlen = senke.kennzahlen(ergebnis.zeit)
+
+    # Wartezeiten in Abfahrtsreihenfolge
+    reihenfolge = sorted(timetable, key=lambda zug: zug["depart"]["time"])
+    wartezeiten = [kennzahlen["wartezeit"].get(zug["train_id"], 0.0) for zug in reihenfolge]
+    nicht_angekommen = sum(1 for zug in timetable if not kennzahlen["ankuenfte"].get(zug["train_id"]))
+    drittel = max(1, len(wartezeiten) // 3)
+    anstieg = sum(wartezeiten[-drittel:]) / drittel - sum(wartezeiten[:drittel]) / drittel
+
+    gruende = []
+    if ergebnis.deadlock:
+        gruende.append(f"Deadlock bei {ergebnis.deadlock['zeit']:.0f}s ({', '.join(ergebnis.deadlock['zuege'])})")
+    if nicht_angekommen:
+        gruende.append(f"{nicht_angekommen} Züge nicht angekommen")
+    if max(wartezeiten, default=0.0) > kriterien["max_wartezeit"]:
+        gruende.append(f"Wartezeit {max(wartezeiten):.0f}s > {kriterien['max_wartezeit']}s")
+    if anstieg > kriterien["stabilitaet_toleranz"]:
+        gruende.append(f"Wartezeit wächst um {anstieg:.0f}s")
+    return {
+        "fahrbar": not gruende,
+        "gruende": gruende,
+        "zuege": len(timetable),
+        "nicht_angekommen": nicht_angekommen,
+        "deadlock_zeit": ergebnis.deadlock["zeit"] if ergebnis.deadlock else None,
+        "wartezeit_max": max(wartezeiten, default=0.0),
+        "wartezeit_anstieg": anstieg
+    }
+
+def _bewerte(auftrag):
+    return bewerte_fahrplan(*auftrag)
+
+def suche_kapazitaet(infra_data, timetable, breaktimes, takt_min=takt_min, takt_max=takt_max,
+                     genauigkeit=genauigkeit, fenster=fenster, nachlauf=nachlauf, gemeinsam=gemeinsam,
+                     kriterien=None, cache=None, worker=worker):
+    """Kleinste fahrbare Zugfolgezeit je Richtung (bzw. "beide" bei gemeinsam).
+
+    Angenommen wird, dass ein fahrbarer Takt auch mit größerer Zugfolgezeit fahrbar bleibt.
+    Rückgabe: {richtung: {"takt", "zuege_pro_stunde", "bewertungen": {takt: Bewertung}}};
+    "takt" ist None, wenn schon takt_max nicht fahrbar ist.
+    """
+    kriterien = kriterien or {"max_wartezeit": max_wartezeit, "stabilitaet_toleranz": stabilitaet_toleranz}
+    muster = muster_zuege(timetable, infra_data["route"])
+    szenarien = {"beide": list(muster.values())} if gemeinsam else {r: [z] for r, z in muster.items()}
+    horizont = fenster + nachlauf
+    bewertungen = {name: {} for name in szenarien}
+
+    executor = ProcessPoolExecutor(max_workers=worker) if worker and worker > 1 else None
+    try:
+        def bewerte_alle(kandidaten):
+            """kandidaten: Liste (szenario, takt); gecachte Szenarien werden nicht simuliert"""
+            offen = []
+            for name, takt in kandidaten:
+                auftrag = (infra_data, erzeuge_fahrplan(szenarien[name], takt, fenster), breaktimes, horizont, kriterien)
+                schluessel = cache.schluessel("kapazitaet", *auftrag) if cache is not None else None
+                bewertung = cache.hole(schluessel) if cache is not None else None
+                if bewertung is None:
+                    offen.append((name, takt, schluessel, auftrag))
+                else:
+                    bewertungen[name][takt] = bewertung
+            auftraege = [auftrag for *_, auftrag in offen]
+            ergebnisse = executor.map(_bewerte, auftraege) if executor else map(_bewerte, auftraege)
+            for (name, takt, schluessel, _), bewertung in zip(offen, ergebnisse):
+                bewertungen[name][takt] = bewertung
+                if cache is not None:
+                    cache.lege_ab(schluessel, bewertung)
+
+        # Ränder des Suchbereichs
+        bewerte_alle([(name, takt) for name in szenarien for takt in (takt_min, takt_max)])
+        intervalle = {}
+        for name in szenarien:
+            if bewertungen[name][takt_max]["fahrbar"] and not bewertungen[name][takt_min]["fahrbar"]:
+                intervalle[name] = [takt_min, takt_max]  # [nicht fahrbar, fahrbar]
+
+        # Parallele Bisektion: je Runde teilen k Kandidaten jedes offene Intervall
+        while True:
+            offen = [name for name, (unten, oben) in intervalle.items() if oben - unten > genauigkeit]
+            if not offen:
+                break
+            k = max(1, (worker or 1) // len(offen))
+            kandidaten = []
+            for name in offen:
+                unten, oben = intervalle[name]
+                punkte = {round(unten + (oben - unten) * j / (k + 1), 1) for j in range(1, k + 1)}
+                kandidaten += [(name, takt) for takt in sorted(punkte) if unten < takt < oben]
+            if not kandidaten:
+                break
+            bewerte_alle(kandidaten)
+            for name in offen:
+                unten, oben = intervalle[name]
+                fahrbar = [t for t, b in bewertungen[name].items() if unten <= t <= oben and b["fahrbar"]]
+                oben = min(fahrbar + [oben])
+                unten = max([t for t, b in bewertungen[name].items() if unten <= t < oben and not b["fahrbar"]] + [unten])
+                intervalle[name] = [unten, oben]
+    finally:
+        if executor:
+            executor.shutdown()
+
+    ergebnis = {}
+    for name in szenarien:
+        if name in intervalle:
+            takt = intervalle[name][1]
+        elif bewertungen[name][takt_min]["fahrbar"]:
+            takt = takt_min
+        else:
+            takt = None
+        ergebnis[name] = {
+            "takt": takt,
+            "zuege_pro_stunde": 3600 / takt if takt else None,
+            "bewertungen": dict(sorted(bewertungen[name].items()))
+        }
+    return ergebnis
+
+if __name__ == "__main__":
+    infra_data, timetable, breaktimes = simulation.lade_eingaben()
+    cache = ArtefaktCache("cache")
+    ergebnis = suche_kapazitaet(infra_data, timetable, breaktimes, cache=cache)
+
+    os.makedirs("json", exist_ok=True)
+    with open("json/kapazitaet.json", "w") as f:
+        json.dump(ergebnis, f, indent=2, ensure_ascii=False)
+
+    for name, e in ergebnis.items():
+        if e["takt"] is None:
+            print(f"❌ {name}: schon {takt_max}s Zugfolgezeit nicht fahrbar")
+        else:
+            print(f"🚆 {name}: Zugfolgezeit {e['takt']:.0f}s → {e['zuege_pro_stunde']:.2f} Züge/h "
+                  f"({len(e['bewertungen'])} Szenarien bewertet)")
+    print(f"Cache: {cache.treffer} Treffer, {cache.fehlschlaege} neu simuliert")
+    print("✅ JSON erstellt: json/kapazitaet.json")
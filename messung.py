@@ -0,0 +1,252 @@
+"""Messpunkte für Laufzeit, CPU-Zeit und Spitzenspeicher der Pipeline-Stufen.
+
+Stufen werden mit "with messung.stufe(name):" umschlossen, einzelne Funktionen mit
+@messung.gemessen. Geschachtelte Messpunkte erscheinen im Bericht als Pfad
+("pipeline/6_bremspunkte/breaktimes_batch"), mehrfache Aufrufe werden aufsummiert.
+
+Eingeschaltet wird über die Umgebungsvariable MESSUNG, z. B.
+
+    MESSUNG=zeit python 7_simulation.py
+    MESSUNG=speicher,cprofile python pipeline.py
+
+"zeit" misst Wand- und CPU-Zeit, "speicher" zusätzlich den Spitzenspeicher (tracemalloc,
+deutlich langsamer), "cprofile" bzw. "sampling" legen je äußerster Stufe ein Profil in
+ausgabe_ordner ab. Beim Beenden des Prozesses wird der Bericht als JSON geschrieben.
+Ohne MESSUNG kosten die Messpunkte nur eine Abfrage. Arbeit in Worker-Prozessen wird
+nur als Wandzeit der aufrufenden Stufe erfasst.
+"""
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Einstellungen
+_optionen = {o.strip() for o in os.environ.get("MESSUNG", "").split(",") if o.strip()}
+aktiv = bool(_optionen)
+speicher_messen = "speicher" in _optionen
+profiler = "cprofile" if "cprofile" in _optionen else "sampling" if "sampling" in _optionen else None
+abtastintervall = 0.005  # s zwischen zwei Stichproben beim Sampling
+top_n = 15               # Funktionen je Profil im Bericht
+ausgabe_ordner = "messung"
+
+_messwerte = {}  # {pfad: {"aufrufe", "wand_s", "cpu_s", "spitzenspeicher_bytes"}}
+_profile = {}    # {stufe: Profilauswertung}
+_stapel = []     # offene Messpunkte: [pfad, spitze]
+
+def konfiguriere(an=True, speicher=False, profil=None):
+    """Schaltet die Messung zur Laufzeit um (statt über MESSUNG); profil: None, "cprofile" oder "sampling" """
+    global aktiv, speicher_messen, profiler
+    aktiv, speicher_messen, profiler = an, speicher, profil
+
+def zuruecksetzen():
+    _messwerte.clear()
+    _profile.clear()
+
+class _Abtaster:
+    """Stichproben-Profiler: zählt in festem Abstand den Aufrufstapel eines Threads"""
+    def __init__(self, thread_id, intervall):
+        self.thread_id = thread_id
+        self.intervall = intervall
+        self.stapel = {}  # {"datei:funktion;...": Anzahl}, Wurzel zuerst
+        self._stopp = threading.Event()
+        self._thread = threading.Thread(target=self._laufe, daemon=True)
+
+    def _laufe(self):
+        while not self._stopp.wait(self.intervall):
+            frame = sys._current_frames().get(self.thread_id)
+            rahmen = []
+            while frame is not None:
+                code = frame.f_code
+                rahmen.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if rahmen:
+                schluessel = ";".join(reversed(rahmen))
+                self.stapel[schluessel] = self.stapel.get(schluessel, 0) + 1
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stopp.set()
+        self._thread.join()
+
+def _dateiname(name):
+    return "".join(z if z.isalnum() or z in "._-" else "_" for z in name)
+
+def _werte_aus(name, prof):
+    """Schreibt das Profil einer Stufe in ausgabe_ordner und gibt die teuersten Funktionen zurück"""
+    os.makedirs(ausgabe_ordner, exist_ok=True)
+    if isinstance(prof, cProfile.Profile):
+        pfad = os.path.join(ausgabe_ordner, f"{_dateiname(name)}.prof")
+        prof.dump_stats(pfad)
+        stats = pstats.Stats(prof).stats
+        zeilen = sorted(stats.items(), key=lambda e: e[1][3], reverse=True)[:top_n]
+        top = [{"funktion": f"{os.path.basename(datei)}:{zeile}:{funktion}", "aufrufe": nc,
+                "eigen_s": round(tt, 4), "gesamt_s": round(ct, 4)}
+               for (datei, zeile, funktion), (_, nc, tt, ct, _) in zeilen]
+        return {"art": "cprofile", "datei": pfad, "top": top}
+
+    # Sampling: gefaltete Stapel (Format für Flamegraph-Werkzeuge), Top nach eigenen Stichproben
+    pfad = os.path.join(ausgabe_ordner, f"{_dateiname(name)}.folded")
+    with open(pfad, "w") as f:
+        for schluessel, anzahl in sorted(prof.stapel.items()):
+            f.write(f"{schluessel} {anzahl}\n")
+    eigen, gesamt = {}, {}
+    for schluessel, anzahl in prof.stapel.items():
+        rahmen = schluessel.split(";")
+        eigen[rahmen[-1]] = eigen.get(rahmen[-1], 0) + anzahl
+        for funktion in set(rahmen):
+            gesamt[funktion] = gesamt.get(funktion, 0) + anzahl
+    summe = sum(prof.stapel.values()) or 1
+    top = [{"funktion": funktion, "eigen_anteil": round(anzahl / summe, 4),
+            "gesamt_anteil": round(gesamt[funktion] / summe, 4)}
+           for funktion, anzahl in sorted(eigen.items(), key=lambda e: e[1], reverse=True)[:top_n]]
+    return {"art": "sampling", "datei": pfad, "stichproben": sum(prof.stapel.values()), "top": top}
+
+@contextmanager
+def stufe(name):
+    """Misst den umschlossenen Block als Messpunkt name (unterhalb des offenen Messpunkts)"""
+    if not aktiv:
+        yield
+        return
+    pfad = f"{_stapel[-1][0]}/{name}" if _stapel else name
+    prof = None
+    if profiler and not _stapel:  # Profile nur je äußerster Stufe, sie lassen sich nicht schachteln
+        prof = cProfile.Profile() if profiler == "cprofile" else _Abtaster(threading.get_ident(), abtastintervall)
+    werte = _messwerte.setdefault(pfad, {"aufrufe": 0, "wand_s": 0.0, "cpu_s": 0.0, "spitzenspeicher_bytes": None})
+    gestartet = speicher_messen and not tracemalloc.is_tracing()
+    if speicher_messen:
+        if gestartet:
+            tracemalloc.start()
+        basis, spitze = tracemalloc.get_traced_memory()
+        if _stapel:  # bisherige Spitze dem umgebenden Messpunkt gutschreiben
+            _stapel[-1][1] = max(_stapel[-1][1], spitze)
+        tracemalloc.reset_peak()
+    eintrag = [pfad, 0]
+    _stapel.append(eintrag)
+    if prof:
+        prof.enable()
+    wand, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wand, cpu = time.perf_counter() - wand, time.process_time() - cpu
+        if prof:
+            prof.disable()
+        _stapel.pop()
+        werte["aufrufe"] += 1
+        werte["wand_s"] += wand
+        werte["cpu_s"] += cpu
+        if speicher_messen:
+            spitze = max(eintrag[1], tracemalloc.get_traced_memory()[1])
+            werte["spitzenspeicher_bytes"] = max(werte["spitzenspeicher_bytes"] or 0, spitze - basis)
+            if _stapel:
+                _stapel[-1][1] = max(_stapel[-1][1], spitze)
+            if gestartet:
+                tracemalloc.stop()
+            else:
+                tracemalloc.reset_peak()
+        if prof:
+            _profile[pfad] = _werte_aus(pfad, prof)
+
+def gemessen(funktion=None, name=None):
+    """Dekorator: jeder Aufruf ist ein Messpunkt (Standardname: Funktionsname)"""
+    if funktion is None:
+        return functools.partial(gemessen, name=name)
+    name = name or funktion.__name__
+
+    @functools.wraps(funktion)
+    def gemessene_funktion(*args, **kwargs):
+        if not aktiv:
+            return funktion(*args, **kwargs)
+        with stufe(name):
+            return funktion(*args, **kwargs)
+    return gemessene_funktion
+
+def bericht():
+    """Alle Messpunkte in der Reihenfolge ihres ersten Aufrufs und die Profile je äußerster Stufe"""
+    messpunkte = [
+        {"pfad": pfad, "aufrufe": w["aufrufe"], "wand_s": round(w["wand_s"], 4), "cpu_s": round(w["cpu_s"], 4),
+         "spitzenspeicher_bytes": w["spitzenspeicher_bytes"]}
+        for pfad, w in _messwerte.items()
+    ]
+    return {
+        "zeitpunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "skript": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+        "optionen": {"speicher": speicher_messen, "profiler": profiler},
+        "messpunkte": messpunkte,
+        "profile": dict(_profile)
+    }
+
+def drucke_bericht(daten=None):
+    daten = daten or bericht()
+    print(f"{'Messpunkt':<50} {'Aufrufe':>8} {'Wand [s]':>10} {'CPU [s]':>10} {'Spitze [MB]':>12}")
+    for m in daten["messpunkte"]:
+        tiefe = m["pfad"].count("/")
+        name = "  " * tiefe + m["pfad"].rsplit("/", 1)[-1]
+        spitze = f"{m['spitzenspeicher_bytes'] / 1024 ** 2:12.1f}" if m["spitzenspeicher_bytes"] is not None else f"{'-':>12}"
+        print(f"{name:<50} {m['aufrufe']:>8} {m['wand_s']:>10.3f} {m['cpu_s']:>10.3f} {spitze}")
+    for name, p in daten["profile"].items():
+        print(f"📄 Profil {name}: {p['datei']}")
+
+def schreibe_bericht(pfad=None):
+    """Schreibt den Bericht als JSON (Standard: ausgabe_ordner/bericht_<skript>_<zeit>.json)"""
+    if not _messwerte:
+        return None
+    daten = bericht()
+    if pfad is None:
+        skript = os.path.splitext(daten["skript"] or "python")[0]
+        pfad = os.path.join(ausgabe_ordner, f"bericht_{_dateiname(skript)}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    with open(pfad, "w") as f:
+        json.dump(daten, f, indent=2, ensure_ascii=False)
+    return pfad
+
+def _beim_beenden():
+    pfad = schreibe_bericht()
+    if pfad:
+        drucke_bericht()
+        print(f"✅ Messbericht erstellt: {pfad}")
+
+if aktiv:
+    atexit.register(_beim_beenden)
+
+if __name__ == "__main__":
+    # Misst die ganze Kette 4–8 mit den Eingaben im Repo. Die Skripte melden an das
+    # importierte Modul messung, nicht an dieses __main__; daher wird jenes eingeschaltet.
+    import importlib
+    import tempfile
+    import messung
+    import simulationslog
+
+    messung.konfiguriere(True, speicher_messen, profiler)
+    simulation = importlib.import_module("7_simulation")
+
+    with messung.stufe("4-6_pipeline"):
+        infra_data, timetable, breaktimes = simulation.lade_eingaben(breaktimes_aus_pipeline=True)
+
+    with tempfile.TemporaryDirectory() as ordner:
+        log_pfad = os.path.join(ordner, "simulation_log.jsonl")
+        with messung.stufe("7_simulation"):
+            simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, simulation.max_sim_time,
+                                             [simulationslog.DateiSenke(log_pfad)])
+        try:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            visualisierung = importlib.import_module("8_visualisierung")
+        except ImportError as e:
+            print(f"⚠️ 8_visualisierung übersprungen: {e}")
+        else:
+            with messung.stufe("8_visualisierung"):
+                visualisierung.InfrastructureVisualizer("1_Infrastruktur.yaml", log_pfad)
+
+    atexit.unregister(messung._beim_beenden)  # Bericht nicht zweimal, falls MESSUNG gesetzt ist
+    pfad = messung.schreibe_bericht()
+    messung.drucke_bericht()
+    print(f"✅ Messbericht erstellt: {pfad}")
@@ -0,0 +1,173 @@
+"""Monte-Carlo-Replikationen der Simulation mit gestörten Halte- und Fahrzeiten.
+
+Jede Replikation zieht mit eigenem Seed je Halt einen Haltezeitzuschlag und je Zug einen
+Fahrzeitfaktor, simuliert den gestörten Fahrplan und misst Wartezeiten, Ankunftsverspätungen
+gegenüber dem ungestörten Lauf und den Durchsatz. Die Replikationen laufen in einem
+Prozesspool; das Ergebnis hängt nur von seed ab, nicht von der Anzahl der Worker.
+"""
+import copy
+import importlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from simulationslog import KennzahlenSenke
+
+simulation = importlib.import_module("7_simulation")
+
+# Einstellungen
+replikationen = 1000
+worker = os.cpu_count()
+seed = 42
+horizont = simulation.max_sim_time
+puenktlichkeit_schwelle = 180  # Ankunft gilt bis zu dieser Verspätung in s als pünktlich
+quantile = [0.05, 0.5, 0.95]
+
+# Verteilungen: "konstant" (wert), "normal" (mittel, std), "lognormal" (mittel, std der
+# Werte selbst), "exponential" (mittel), "gleich" (min, max); optional "grenzen": [min, max]
+stoerungen = {
+    "haltezeit": {"verteilung": "exponential", "mittel": 15.0},  # Zuschlag je Halt in s
+    "fahrzeit": {"verteilung": "lognormal", "mittel": 1.0, "std": 0.03}  # Faktor je Zug
+}
+
+def ziehe(rng, verteilung, anzahl):
+    """anzahl Werte aus verteilung (siehe stoerungen)"""
+    art = verteilung["verteilung"]
+    if art == "konstant":
+        werte = np.full(anzahl, float(verteilung["wert"]))
+    elif art == "normal":
+        werte = rng.normal(verteilung["mittel"], verteilung["std"], anzahl)
+    elif art == "lognormal":
+        # Parameter der zugrunde liegenden Normalverteilung aus Mittelwert und Streuung
+        sigma2 = math.log(1 + (verteilung["std"] / verteilung["mittel"]) ** 2)
+        werte = rng.lognormal(math.log(verteilung["mittel"]) - sigma2 / 2, math.sqrt(sigma2), anzahl)
+    elif art == "exponential":
+        werte = rng.exponential(verteilung["mittel"], anzahl)
+    elif art == "gleich":
+        werte = rng.uniform(verteilung["min"], verteilung["max"], anzahl)
+    else:
+        raise ValueError(f"Unbekannte Verteilung: {art}")
+    if "grenzen" in verteilung:
+        werte = np.clip(werte, *verteilung["grenzen"])
+    return werte
+
+def stoere_fahrplan(timetable, stoerungen, rng):
+    """Kopie des Fahrplans mit gezogenen Haltezeitzuschlägen und Fahrzeitfaktoren"""
+    gestoert = copy.deepcopy(timetable)
+    for zug in gestoert:
+        if "fahrzeit" in stoerungen:
+            zug["fahrzeitfaktor"] = float(ziehe(rng, stoerungen["fahrzeit"], 1)[0])
+        halte = zug.get("stops", [])
+        if "haltezeit" in stoerungen and halte:
+            zuschlaege = ziehe(rng, stoerungen["haltezeit"], len(halte))
+            for halt, zuschlag in zip(halte, zuschlaege):
+                halt["stop_time"] = max(0.0, halt.get("stop_time", 0) + float(zuschlag))
+    return gestoert
+
+def laufe(infra_data, timetable, breaktimes, horizont):
+    """Ein Lauf ohne Log-Ausgabe; Rückgabe der Kennzahlen der KennzahlenSenke"""
+    senke = KennzahlenSenke()
+    ergebnis = simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, horizont, [senke])
+    return senke.kennzahlen(ergebnis.zeit)
+
+def bewerte(kennzahlen, referenz, horizont, schwelle=puenktlichkeit_schwelle):
+    """Skalare Kennzahlen eines Laufs; Verspätungen je Ankunft gegenüber dem Referenzlauf"""
+    wartezeiten = list(kennzahlen["wartezeit"].values())
+    verspaetungen = []
+    ausgefallen = 0
+    for zug_id, ankuenfte_ref in referenz["ankuenfte"].items():
+        ankuenfte = kennzahlen["ankuenfte"].get(zug_id, [])
+        verspaetungen += [t - t_ref for t, t_ref in zip(ankuenfte, ankuenfte_ref)]
+        ausgefallen += max(0, len(ankuenfte_ref) - len(ankuenfte))
+    ankuenfte_gesamt = sum(len(a) for a in kennzahlen["ankuenfte"].values())
+    return {
+        "ankuenfte": ankuenfte_gesamt,
+        "durchsatz_pro_stunde": ankuenfte_gesamt * 3600 / horizont,
+        "ankuenfte_nach_horizont": ausgefallen,
+        "wartezeit_summe": float(sum(wartezeiten)),
+        "wartezeit_max": float(max(wartezeiten, default=0.0)),
+        "verspaetung_mittel": float(np.mean(verspaetungen)) if verspaetungen else math.nan,
+        "verspaetung_max": float(max(verspaetungen)) if verspaetungen else math.nan,
+        "puenktlichkeit": float(np.mean(np.asarray(verspaetungen) <= schwelle)) if verspaetungen else math.nan
+    }
+
+# Daten je Worker-Prozess, einmal über den Initializer übergeben
+_kontext = {}
+
+def _initialisiere(kontext):
+    _kontext.update(kontext)
+
+def _replikation(nummer):
+    k = _kontext
+    rng = np.random.default_rng(np.random.SeedSequence([k["seed"], nummer]))
+    fahrplan = stoere_fahrplan(k["timetable"], k["stoerungen"], rng)
+    kennzahlen = laufe(k["infra_data"], fahrplan, k["breaktimes"], k["horizont"])
+    return {"replikation": nummer, **bewerte(kennzahlen, k["referenz"], k["horizont"])}
+
+def aggregiere(laeufe, quantile=quantile):
+    """Mittelwert, Streuung, Quantile und 95 %-Konfidenzintervall des Mittelwerts je Kennzahl"""
+    statistik = {}
+    for name in laeufe[0]:
+        if name == "replikation":
+            continue
+        werte = np.array([lauf[name] for lauf in laeufe], dtype=float)
+        werte = werte[~np.isnan(werte)]
+        if len(werte) == 0:
+            continue
+        mittel = float(werte.mean())
+        std = float(werte.std(ddof=1)) if len(werte) > 1 else 0.0
+        halbbreite = 1.96 * std / math.sqrt(len(werte))  # Normalapproximation
+        statistik[name] = {
+            "mittel": mittel,
+            "std": std,
+            "quantile": {str(q): float(np.quantile(werte, q)) for q in quantile},
+            "ki95": [mittel - halbbreite, mittel + halbbreite],
+            "n": int(len(werte))
+        }
+    return statistik
+
+def fuehre_replikationen(infra_data, timetable, breaktimes, n=replikationen, stoerungen=stoerungen,
+                         horizont=horizont, seed=seed, worker=worker):
+    """n gestörte Läufe, parallel bei worker > 1.
+
+    Rückgabe: {"referenz": Kennzahlen des ungestörten Laufs, "kennzahlen": Statistik je
+    Kennzahl, "laeufe": Kennzahlen je Replikation}.
+    """
+    referenz = laufe(infra_data, timetable, breaktimes, horizont)
+    kontext = {
+        "infra_data": infra_data, "timetable": timetable, "breaktimes": breaktimes,
+        "stoerungen": stoerungen, "horizont": horizont, "seed": seed, "referenz": referenz
+    }
+    if worker and worker > 1:
+        with ProcessPoolExecutor(max_workers=worker, initializer=_initialisiere, initargs=(kontext,)) as executor:
+            laeufe = list(executor.map(_replikation, range(n), chunksize=max(1, n // (4 * worker))))
+    else:
+        _initialisiere(kontext)
+        laeufe = [_replikation(nummer) for nummer in range(n)]
+    return {
+        "replikationen": n,
+        "seed": seed,
+        "stoerungen": stoerungen,
+        "referenz": bewerte(referenz, referenz, horizont),
+        "kennzahlen": aggregiere(laeufe),
+        "laeufe": laeufe
+    }
+
+if __name__ == "__main__":
+    import time
+    infra_data, timetable, breaktimes = simulation.lade_eingaben()
+
+    start = time.perf_counter()
+    ergebnis = fuehre_replikationen(infra_data, timetable, breaktimes)
+    dauer = time.perf_counter() - start
+
+    os.makedirs("json", exist_ok=True)
+    with open("json/monte_carlo.json", "w") as f:
+        json.dump(ergebnis, f, indent=2)
+
+    print(f"🎲 {ergebnis['replikationen']} Replikationen in {dauer:.1f}s ({worker} Worker)")
+    for name, s in ergebnis["kennzahlen"].items():
+        q = ", ".join(f"q{float(k) * 100:g}={v:.1f}" for k, v in s["quantile"].items())
+        print(f"  {name:<25} {s['mittel']:9.2f} ± {s['ki95'][1] - s['mittel']:.2f}  ({q})")
+    print("✅ JSON erstellt: json/monte_carlo.json")
@@ -0,0 +1,66 @@
+"""Pipeline von den YAML-Eingaben bis zu den Breaktimes, vollständig im Speicher.
+
+Die nummerierten Skripte bleiben einzeln lauffähig; hier werden ihre Funktionen ohne
+Umweg über CSV- und JSON-Dateien verkettet. Dateien entstehen nur über exportiere().
+"""
+import importlib
+import json
+import os
+import yaml
+import messung
+import profilspeicher
+from artefakt_cache import ArtefaktCache
+
+streckenabschnitte = importlib.import_module("4_streckenabschnitte")
+fahrprofile = importlib.import_module("5_Fahrprofile")
+bremspunkte = importlib.import_module("6_Bremspunkte")
+
+def lade_yaml(pfad):
+    with open(pfad, "r") as f:
+        return yaml.safe_load(f)
+
+@messung.gemessen
+def fuehre_pipeline_aus(infra_data, vprofile_data, beschleunigen=fahrprofile.beschleunigen, bremsen=fahrprofile.bremsen, dt=0.1, cache=None, worker=None):
+    """Abschnitte teilen, Fahrprofile rechnen, Breakpoints bestimmen.
+
+    Rückgabe: Dict mit "streckenabschnitte" (wie streckenabschnitte.json),
+    "profile" ({name: Spalten-Dict}) und "breaktimes" (wie breaktimes.json).
+    Mit einem ArtefaktCache werden nur Abschnitte mit geänderten Eingaben neu gerechnet;
+    die Aufteilung selbst ist das Schlüsselmaterial und wird immer bestimmt.
+    worker > 1 rechnet die Fahrprofile in einem Prozesspool.
+    """
+    route = infra_data["route"]
+    infrastructure = infra_data["infrastructure"]
+    v_segments = vprofile_data["v_profile"][0]["v_segment"]
+
+    abschnitte = streckenabschnitte.teile_streckenabschnitte(route, infrastructure, v_segments)
+    profile = fahrprofile.erzeuge_fahrprofile(abschnitte, beschleunigen, bremsen, dt, cache=cache, worker=worker)
+    breaktimes = bremspunkte.berechne_breaktimes(profile, list(abschnitte.keys()), cache=cache)
+    return {
+        "streckenabschnitte": abschnitte,
+        "profile": profile,
+        "breaktimes": breaktimes
+    }
+
+def erzeuge_breaktimes(infra_pfad="1_Infrastruktur.yaml", vprofil_pfad="2_Vprofil.yaml", **optionen):
+    """Breaktimes direkt aus den YAML-Dateien, wie sie 7_simulation.py verwendet"""
+    return fuehre_pipeline_aus(lade_yaml(infra_pfad), lade_yaml(vprofil_pfad), **optionen)["breaktimes"]
+
+def exportiere(ergebnis, json_ordner="json", npy_ordner="npy", csv_ordner=None):
+    """Optionaler Export der Zwischenstände; CSV-Dateien nur, wenn csv_ordner angegeben ist"""
+    os.makedirs(json_ordner, exist_ok=True)
+    with open(os.path.join(json_ordner, "streckenabschnitte.json"), "w") as f:
+        json.dump(ergebnis["streckenabschnitte"], f, indent=2)
+    profilspeicher.speichere(ergebnis["profile"], npy_ordner)
+    if csv_ordner:
+        for name, spalten in ergebnis["profile"].items():
+            fahrprofile.speichere_csv(spalten, name, csv_ordner)
+    with open(os.path.join(json_ordner, "breaktimes.json"), "w") as f:
+        json.dump(ergebnis["breaktimes"], f, indent=2)
+
+if __name__ == "__main__":
+    cache = ArtefaktCache("cache")
+    ergebnis = fuehre_pipeline_aus(lade_yaml("1_Infrastruktur.yaml"), lade_yaml("2_Vprofil.yaml"), cache=cache)
+    exportiere(ergebnis)
+    print(f"\n✅ Pipeline abgeschlossen: {len(ergebnis['breaktimes'])} Abschnitte "
+          f"(Cache: {cache.treffer} Treffer, {cache.fehlschlaege} neu berechnet)")
@@ -0,0 +1,56 @@
+"""Binärer Spaltenspeicher für alle Fahrprofile einer Strecke.
+
+Alle Profile liegen in einer .npy-Datei der Form (4, n_zeilen) in float64, je Zeile eine
+Spalte (Zeit, Position, Geschwindigkeit, Beschleunigung), die Profile hintereinander.
+Eine JSON-Datei daneben hält je Profil Abschnitt, Start-/Stopptyp, Offset und Zeilenbereich.
+Leser können die .npy-Datei per Memory-Mapping öffnen, ohne sie zu parsen.
+"""
+import json
+import os
+import numpy as np
+
+SPALTEN = ["Zeit [s]", "Position [m]", "Geschwindigkeit [m/s]", "Beschleunigung [m/s²]"]
+
+def _pfade(ordner, name):
+    return os.path.join(ordner, f"{name}.npy"), os.path.join(ordner, f"{name}.json")
+
+def speichere(profile, ordner="npy", name="fahrprofile"):
+    """Schreibt {profilname: Spalten-Dict} (Namen wie S1_0_to_v); Rückgabe ist der .npy-Pfad"""
+    os.makedirs(ordner, exist_ok=True)
+    npy_pfad, json_pfad = _pfade(ordner, name)
+
+    bloecke, index = [], []
+    zeile = 0
+    for profilname, spalten in profile.items():
+        block = np.vstack([np.asarray(spalten[s], dtype=np.float64) for s in SPALTEN])
+        abschnitt, start_code, _, stop_code = profilname.rsplit("_", 3)
+        index.append({
+            "name": profilname,
+            "abschnitt": abschnitt,
+            "start": "start0" if start_code == "0" else "startV",
+            "stop": "stop0" if stop_code == "0" else "stopV",
+            "x_offset": float(block[1, 0]),
+            "von": zeile,
+            "bis": zeile + block.shape[1]
+        })
+        bloecke.append(block)
+        zeile += block.shape[1]
+
+    daten = np.hstack(bloecke) if bloecke else np.empty((len(SPALTEN), 0))
+    np.save(npy_pfad, np.ascontiguousarray(daten))
+    with open(json_pfad, "w") as f:
+        json.dump({"spalten": SPALTEN, "profile": index}, f, indent=2)
+    return npy_pfad
+
+def lade_metadaten(ordner="npy", name="fahrprofile"):
+    with open(_pfade(ordner, name)[1]) as f:
+        return json.load(f)["profile"]
+
+def lade(ordner="npy", name="fahrprofile", mmap=True):
+    """Liefert {profilname: Spalten-Dict}; die Spalten sind Sichten auf die (gemappte) Datei"""
+    npy_pfad, _ = _pfade(ordner, name)
+    daten = np.load(npy_pfad, mmap_mode="r" if mmap else None)
+    return {
+        eintrag["name"]: {s: daten[i, eintrag["von"]:eintrag["bis"]] for i, s in enumerate(SPALTEN)}
+        for eintrag in lade_metadaten(ordner, name)
+    }
@@ -0,0 +1,284 @@
+"""Ereignisprotokoll der Simulation und Rekonstruktion des Zustands zu beliebigen Zeiten.
+
+Statt in festen Intervallen den vollständigen Zustand aller Züge abzulegen, schreibt die
+Simulation nur dann einen Eintrag, wenn sich bei einem Zug etwas ändert:
+
+    {"t": 241.3, "zug": "Z5", "element": "S9", "reserved": ["S9", "BIST"]}
+
+Ein Eintrag enthält die Zeit (exakt, ohne Rundung), den Zug und nur die geänderten Felder;
+der erste Eintrag eines Zuges enthält alle Felder. {"t": ..., "zug": ..., "ende": true}
+bedeutet, dass der Zug seinen Lauf beendet hat und nicht mehr aktiv ist.
+
+Wohin die Ereignisse gehen, bestimmen die Senken des Protokolls: keine (KeineSenke),
+eine Liste im Speicher (ListenSenke), eine Datei mit einer Zeile je Ereignis (DateiSenke)
+oder nur Zähler für eine Zusammenfassung (ZaehlerSenke); KennzahlenSenke führt Warte-
+und Ankunftszeiten je Zug für Auswertungen mit. Jede Senke hat schreibe() und schliesse().
+
+Dateien sind JSON Lines (eine Zeile je Ereignis, mit Endung .gz gzip-komprimiert) und
+können mit lies_ereignisse() Zeile für Zeile gelesen werden, ohne sie ganz zu laden.
+"""
+import gzip
+import json
+import os
+import time
+from itertools import chain
+
+# Mögliche Logdateien der Simulation; finde_log() nimmt die zuletzt geschriebene
+LOG_DATEIEN = ["simulation_log.jsonl.gz", "simulation_log.jsonl", "simulation_log.json"]
+
+FELDER = ("element", "status", "direction", "breaktime_info", "reserved")
+
+def zustand_aus_status(status):
+    """Übersetzt einen Eintrag des zugstatus in die Felder des Protokolls"""
+    return {
+        "element": status["element"],
+        "status": status["status"],
+        "direction": "forward" if status.get("is_forward", True) else "backward",
+        "breaktime_info": status["breaktime_info"],
+        "reserved": list(status["reserved"])
+    }
+
+class KeineSenke:
+    """Verwirft alle Ereignisse"""
+    def schreibe(self, ereignis):
+        pass
+
+    def schliesse(self):
+        pass
+
+class ListenSenke:
+    """Hält alle Ereignisse in self.ereignisse"""
+    def __init__(self):
+        self.ereignisse = []
+
+    def schreibe(self, ereignis):
+        self.ereignisse.append(ereignis)
+
+    def schliesse(self):
+        pass
+
+def _oeffne(pfad, modus):
+    if pfad.endswith(".gz"):
+        return gzip.open(pfad, modus + "t", encoding="utf-8")
+    return open(pfad, modus, encoding="utf-8")
+
+class DateiSenke:
+    """Schreibt jedes Ereignis als eine JSON-Zeile in pfad, gepuffert und bei .gz komprimiert.
+
+    Der Puffer wird geleert, sobald er puffer_ereignisse Zeilen hält oder seit dem letzten
+    Leeren puffer_sekunden (Wandzeit) vergangen sind, spätestens bei schliesse(). Bei einem
+    harten Abbruch gehen so höchstens die Ereignisse der letzten puffer_sekunden verloren.
+    """
+    def __init__(self, pfad, puffer_ereignisse=1000, puffer_sekunden=1.0):
+        self.pfad = pfad
+        self.puffer_ereignisse = puffer_ereignisse
+        self.puffer_sekunden = puffer_sekunden
+        self._puffer = []
+        self._datei = _oeffne(pfad, "w")
+        self._geleert = time.monotonic()
+
+    def schreibe(self, ereignis):
+        self._puffer.append(json.dumps(ereignis, ensure_ascii=False, separators=(",", ":")))
+        if (len(self._puffer) >= self.puffer_ereignisse
+                or time.monotonic() - self._geleert >= self.puffer_sekunden):
+            self.leere()
+
+    def leere(self):
+        if self._puffer:
+            self._datei.write("\n".join(self._puffer) + "\n")
+            self._puffer = []
+        self._datei.flush()
+        self._geleert = time.monotonic()
+
+    def schliesse(self):
+        if not self._datei.closed:
+            self.leere()
+            self._datei.close()
+
+class ZaehlerSenke:
+    """Speichert keine Ereignisse, sondern nur Zähler je Zug und Feld"""
+    def __init__(self):
+        self.anzahl = 0
+        self.je_zug = {}
+        self.je_feld = {feld: 0 for feld in FELDER}
+        self.beendet = 0
+        self.letzte_zeit = None
+
+    def schreibe(self, ereignis):
+        self.anzahl += 1
+        self.je_zug[ereignis["zug"]] = self.je_zug.get(ereignis["zug"], 0) + 1
+        for feld in FELDER:
+            if feld in ereignis:
+                self.je_feld[feld] += 1
+        if ereignis.get("ende"):
+            self.beendet += 1
+        self.letzte_zeit = ereignis["t"]
+
+    def schliesse(self):
+        pass
+
+    def zusammenfassung(self):
+        return {
+            "ereignisse": self.anzahl,
+            "zuege": len(self.je_zug),
+            "beendet": self.beendet,
+            "letzte_zeit": self.letzte_zeit,
+            "je_zug": dict(sorted(self.je_zug.items())),
+            "je_feld": dict(self.je_feld)
+        }
+
+class KennzahlenSenke:
+    """Führt je Zug die Wartezeit (Status "wartet") und die Ankunftszeiten mit, ohne Ereignisse zu speichern"""
+    def __init__(self):
+        self._status = {}  # {zug_id: (status, seit)}
+        self.wartezeit = {}
+        self.ankuenfte = {}
+
+    def _wechsel(self, zug_id, t, status_neu):
+        status_alt, seit = self._status.get(zug_id, (None, t))
+        if status_alt == "wartet":
+            self.wartezeit[zug_id] = self.wartezeit.get(zug_id, 0.0) + t - seit
+        self._status[zug_id] = (status_neu, t)
+
+    def schreibe(self, ereignis):
+        zug_id, t = ereignis["zug"], ereignis["t"]
+        self.wartezeit.setdefault(zug_id, 0.0)
+        self.ankuenfte.setdefault(zug_id, [])
+        if ereignis.get("ende"):
+            self._wechsel(zug_id, t, None)
+        elif "status" in ereignis:
+            self._wechsel(zug_id, t, ereignis["status"])
+            if ereignis["status"] == "angekommen":
+                self.ankuenfte[zug_id].append(t)
+
+    def schliesse(self):
+        pass
+
+    def kennzahlen(self, t_ende):
+        """Wartezeit je Zug (laufende Wartephasen bis t_ende gezählt) und Ankunftszeiten je Zug"""
+        wartezeit = dict(self.wartezeit)
+        for zug_id, (status, seit) in self._status.items():
+            if status == "wartet":
+                wartezeit[zug_id] += t_ende - seit
+        return {"wartezeit": wartezeit, "ankuenfte": {z: list(a) for z, a in self.ankuenfte.items()}}
+
+def erzeuge_senke(art, pfad=None):
+    """Senke nach Name: "keine", "liste", "datei" (braucht pfad), "zaehler" oder "kennzahlen" """
+    if art == "keine":
+        return KeineSenke()
+    if art == "liste":
+        return ListenSenke()
+    if art == "datei":
+        if pfad is None:
+            raise ValueError("Senke 'datei' braucht einen Pfad")
+        return DateiSenke(pfad)
+    if art == "zaehler":
+        return ZaehlerSenke()
+    if art == "kennzahlen":
+        return KennzahlenSenke()
+    raise ValueError(f"Unbekannte Senke: {art}")
+
+class Ereignisprotokoll:
+    """Erkennt Änderungen je Zug und gibt sie an die Senken weiter.
+
+    melde() erzeugt nur dann ein Ereignis, wenn sich ein Feld geändert hat. Ohne Angabe
+    wird in eine ListenSenke geschrieben.
+    """
+    def __init__(self, senken=None):
+        self.senken = [ListenSenke()] if senken is None else list(senken)
+        self._letzter = {}
+
+    def _schreibe(self, ereignis):
+        for senke in self.senken:
+            senke.schreibe(ereignis)
+
+    def schliesse(self):
+        for senke in self.senken:
+            senke.schliesse()
+
+    def melde(self, t, zug_id, status):
+        zustand = zustand_aus_status(status)
+        alt = self._letzter.get(zug_id, {})
+        aenderung = {feld: wert for feld, wert in zustand.items() if alt.get(feld) != wert}
+        if aenderung:
+            self._letzter[zug_id] = zustand
+            self._schreibe({"t": t, "zug": zug_id, **aenderung})
+
+    def beende(self, t, zug_id):
+        if self._letzter.pop(zug_id, None) is not None:
+            self._schreibe({"t": t, "zug": zug_id, "ende": True})
+
+def wende_an(zustaende, ereignis):
+    """Schreibt ein Ereignis in {zug_id: Zustand} fort"""
+    zug_id = ereignis["zug"]
+    if ereignis.get("ende"):
+        zustaende.pop(zug_id, None)
+        return
+    zustand = zustaende.setdefault(zug_id, {})
+    for feld in FELDER:
+        if feld in ereignis:
+            zustand[feld] = ereignis[feld]
+
+def rekonstruiere(ereignisse, t):
+    """Zustand aller aktiven Züge zur Zeit t ({zug_id: Zustand}).
+
+    ereignisse ist zeitlich sortiert, als Liste oder z. B. direkt aus lies_ereignisse();
+    gelesen wird nur bis zum ersten Ereignis nach t.
+    """
+    zustaende = {}
+    for ereignis in ereignisse:
+        if ereignis["t"] > t:
+            break
+        wende_an(zustaende, ereignis)
+    return {zug_id: dict(zustand) for zug_id, zustand in zustaende.items()}
+
+def iter_schnappschuesse(ereignisse):
+    """Wie schnappschuesse(), aber als Generator über beliebige Ereignisfolgen"""
+    zustaende = {}
+    zeit = None
+    for ereignis in ereignisse:
+        if zeit is not None and ereignis["t"] != zeit:
+            yield {"time": zeit, "trains": {z: dict(zustaende[z]) for z in sorted(zustaende)}}
+        wende_an(zustaende, ereignis)
+        zeit = ereignis["t"]
+    if zeit is not None:
+        yield {"time": zeit, "trains": {z: dict(zustaende[z]) for z in sorted(zustaende)}}
+
+def schnappschuesse(ereignisse):
+    """Ein Eintrag im Format der früheren simulation_log.json je Zeitpunkt mit Änderungen.
+
+    Der Eintrag zur Zeit t gilt bis zum nächsten Eintrag.
+    """
+    return list(iter_schnappschuesse(ereignisse))
+
+def lies_ereignisse(pfad):
+    """Liefert die Ereignisse einzeln; .jsonl/.jsonl.gz werden zeilenweise gelesen"""
+    with _oeffne(pfad, "r") as f:
+        if ".jsonl" in os.path.basename(pfad):
+            for zeile in f:
+                if zeile.strip():
+                    yield json.loads(zeile)
+        else:
+            yield from json.load(f)
+
+def lade(pfad):
+    """Liest ein ganzes Ereignisprotokoll (JSON-Liste, .jsonl oder .jsonl.gz) in eine Liste"""
+    return list(lies_ereignisse(pfad))
+
+def finde_log(ordner="json"):
+    """Pfad des zuletzt geschriebenen Simulationslogs in ordner (siehe LOG_DATEIEN)"""
+    pfade = [os.path.join(ordner, name) for name in LOG_DATEIEN]
+    vorhanden = [pfad for pfad in pfade if os.path.exists(pfad)]
+    if not vorhanden:
+        raise FileNotFoundError(f"Kein Simulationslog in {ordner}/")
+    return max(vorhanden, key=os.path.getmtime)
+
+def lade_schnappschuesse(pfad):
+    """Liest ein Ereignisprotokoll als Schnappschüsse; alte Schnappschuss-Logs bleiben lesbar"""
+    ereignisse = lies_ereignisse(pfad)
+    erstes = next(ereignisse, None)
+    if erstes is None:
+        return []
+    if "trains" in erstes:
+        return [erstes, *ereignisse]
+    return list(iter_schnappschuesse(chain([erstes], ereignisse)))
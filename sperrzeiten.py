@@ -0,0 +1,257 @@
+"""Analytische Sperrzeiten: Belegung der Elemente je Zug ohne SimPy-Lauf.
+
+Für jeden Zug wird berechnet, wann er in 7_simulation.py jedes Element seines Laufwegs
+reserviert und wieder freigibt, wenn er nirgends warten muss: gleiche Vorausreservierung
+bis zum nächsten Knoten mit Kapazität > 1, gleiche Breaktimes, Halte, Vorabbelegung
+(occupied_before_start), Fahrzeitfaktoren und Pendelfahrten bei behaviour "return" bis zum
+Horizont bzw. bis zur Zahl der "rueckfahrten". Wie in der Simulation wartet jeder Zug auf
+seine Abfahrtszeit, Rückfahrten beginnen sofort nach der Ankunft. Züge mit gleichem Muster
+teilen eine Sperrzeitentreppe, die mit NumPy nur noch um die Abfahrtszeiten verschoben wird.
+
+Ein Konflikt liegt vor, wenn ein Element zu einem Zeitpunkt mehr Züge hält, als seine
+Kapazität zulässt. Ein konfliktfreier Fahrplan läuft in der Simulation genau so ab; bei
+Konflikten entscheidet erst die Simulation, wer wartet.
+"""
+import importlib
+import json
+import numpy as np
+
+simulation = importlib.import_module("7_simulation")
+
+def _fahrt(route_used, tabelle, versatz, stops, breaktimes, infra_yaml, faktor, t, endstationen):
+    """Eine Fahrtrichtung ab t ohne Wartezeiten, Schritt für Schritt wie simulate_direction().
+
+    endstationen sind Anfang und Ende der Route; für ihre Einfahrt gelten wie in
+    7_simulation.py die Breaktimes des vorherigen Abschnitts. Rückgabe (reserviert,
+    eintritt, ankunft): Reservierungszeit je Position (ohne Position 0), Einfahrtzeit
+    je Position ab 1 und die Zeit der Ankunft am Ziel.
+    """
+    n = len(route_used) - 1
+    reserviert, eintritt = {}, {}
+
+    def naechster_knoten(i):
+        return min(tabelle["naechster_knoten"][versatz + i] - versatz, n)
+
+    def reserviere(von, bis, zeit):
+        for k in range(von, bis + 1):
+            reserviert.setdefault(k, zeit)
+
+    reserviere(1, naechster_knoten(0), t)
+    for i in range(1, n):
+        current, prev = route_used[i], route_used[i - 1]
+        eintritt[i] = t
+        section = current if current not in endstationen else prev
+        bt = breaktimes.get(section, {}).get("forward" if tabelle["phys_vorwaerts"][versatz + i] else "backward", {})
+        t += bt.get(f"time_at_breakpoint_{'start0' if prev in stops else 'startV'}", 0) * faktor
+        if current in stops:
+            t += stops[current]
+        if i + 1 < n:
+            next_el = route_used[i + 1]
+            if infra_yaml[next_el]["normal_capacity"] == 1:
+                reserviere(i + 1, naechster_knoten(i), t)
+                t += bt.get(f"remaining_time_{'stop0' if next_el in stops else 'stopV'}", 0) * faktor
+            elif next_el in stops:
+                t += bt.get("remaining_time_stop0", 0) * faktor
+            else:
+                if i + 2 < len(route_used):
+                    reserviere(i + 2, naechster_knoten(i + 1), t)
+                t += bt.get("remaining_time_stopV", 0) * faktor
+    eintritt[n] = t
+    if route_used[n] in stops:
+        t += stops[route_used[n]]
+    return reserviert, eintritt, t
+
+def sperrzeitentreppe(zug, route, infra_yaml, breaktimes, routen_index, routentabellen, dauer):
+    """Sperrzeiten eines Zuges relativ zu seinem Fahrtbeginn; bei "return" pendelt er,
+    bis dauer Sekunden erreicht oder seine "rueckfahrten" gefahren sind.
+
+    Rückgabe (elemente, beginn, ende, ankuenfte, vorab): Listen je Belegung, die relativen
+    Ankunftszeiten und die Vorabbelegung der Abfahrtsstation in s (sie beginnt vorab
+    Sekunden vor der Abfahrt, frühestens bei t = 0).
+    """
+    stops = {s["station"]: s.get("stop_time", 0) for s in zug.get("stops", [])}
+    faktor = zug.get("fahrzeitfaktor", 1.0)
+    bein = (zug["depart"]["station"], zug["arrival"]["station"])
+    pendelt = zug["behaviour"] == "return"
+    rueckfahrten = zug.get("rueckfahrten")
+
+    elemente, beginn, ende, ankuenfte = [], [], [], []
+    t, gehalten_seit = 0.0, 0.0  # Abfahrtsstation ab Fahrtbeginn belegt
+    while True:
+        von, nach = bein
+        idx_von, idx_nach = routen_index[von], routen_index[nach]
+        vorwaerts = idx_von < idx_nach
+        route_used = route[idx_von:idx_nach + 1] if vorwaerts else list(reversed(route[idx_nach:idx_von + 1]))
+        versatz = idx_von if vorwaerts else len(route) - 1 - idx_von
+        tabelle = routentabellen["forward" if vorwaerts else "backward"]
+        reserviert, eintritt, t = _fahrt(route_used, tabelle, versatz, stops, breaktimes, infra_yaml, faktor, t,
+                                       (route[0], route[-1]))
+
+        # Abfahrtsstation bis zur Einfahrt in das erste Element, danach je Element bis zur nächsten Einfahrt
+        elemente.append(route_used[0])
+        beginn.append(gehalten_seit)
+        ende.append(eintritt[1] if len(route_used) > 1 else t)
+        for k in range(1, len(route_used) - 1):
+            if k not in reserviert:
+                continue  # Knoten mit Kapazität > 1 zwischen zwei solchen: die Simulation reserviert ihn nicht
+            elemente.append(route_used[k])
+            beginn.append(reserviert[k])
+            ende.append(eintritt[k + 1])
+        gehalten_seit = reserviert.get(len(route_used) - 1, t)
+        ankuenfte.append(t)
+        if not pendelt or t >= dauer or (rueckfahrten is not None and len(ankuenfte) > rueckfahrten):
+            break
+        bein = (nach, von)
+
+    # Ziel der letzten Fahrt bis zum Ende des Zuglaufs
+    elemente.append(route_used[-1])
+    beginn.append(gehalten_seit)
+    ende.append(t)
+
+    vorab = zug["depart"].get("occupied_before_start", 0)
+    return elemente, beginn, ende, ankuenfte, vorab
+
+def fahrtbeginn(zug):
+    """Wie in 7_simulation.py: die erste Fahrt beginnt zur Abfahrtszeit (frühestens bei t = 0)"""
+    return max(0.0, zug["depart"]["time"])
+
+def _muster(zug):
+    stops = tuple(sorted((s["station"], s.get("stop_time", 0)) for s in zug.get("stops", [])))
+    return (zug["depart"]["station"], zug["arrival"]["station"], zug["behaviour"], stops,
+            zug.get("fahrzeitfaktor", 1.0), zug["depart"].get("occupied_before_start", 0), zug.get("rueckfahrten"))
+
+def berechne_sperrzeiten(infra_data, timetable, breaktimes, horizont=simulation.max_sim_time):
+    """Sperrzeiten aller Züge bis horizont als Arrays.
+
+    Rückgabe dict mit "zuege" (train_ids), "elemente" (Namen), je Belegung "zug" und
+    "element" (Indizes), "beginn" und "ende" in s (höchstens horizont), sowie
+    "ankuenfte" {train_id: [t]}.
+    """
+    route, infra_yaml = infra_data["route"], infra_data["infrastructure"]
+    routen_index, routentabellen = simulation.kompiliere_routentabellen(route, infra_yaml)
+    elemente = list(infra_yaml)
+    element_index = {name: i for i, name in enumerate(elemente)}
+
+    gruppen = {}
+    for nummer, zug in enumerate(timetable):
+        gruppen.setdefault(_muster(zug), []).append(nummer)
+
+    teile = {"zug": [], "element": [], "beginn": [], "ende": []}
+    ankuenfte = {}
+    for nummern in gruppen.values():
+        start = np.array([fahrtbeginn(timetable[n]) for n in nummern])[:, None]
+        namen, beginn, ende, ankunft, vorab = sperrzeitentreppe(
+            timetable[nummern[0]], route, infra_yaml, breaktimes, routen_index, routentabellen,
+            horizont - start.min())
+        b = start + np.asarray(beginn)
+        if vorab:
+            b[:, 0] = np.maximum(0.0, b[:, 0] - vorab)
+        e = np.minimum(start + np.asarray(ende), horizont)
+        im_horizont = (b < horizont).ravel()
+        teile["zug"].append(np.repeat(nummern, len(namen))[im_horizont])
+        teile["element"].append(np.tile([element_index[name] for name in namen], len(nummern))[im_horizont])
+        teile["beginn"].append(b.ravel()[im_horizont])
+        teile["ende"].append(e.ravel()[im_horizont])
+        for n, s in zip(nummern, start[:, 0]):
+            ankuenfte[timetable[n]["train_id"]] = [float(s + t) for t in ankunft if s + t <= horizont]
+
+    sperrzeiten = {name: np.concatenate(werte) if werte else np.array([]) for name, werte in teile.items()}
+    sperrzeiten["zug"] = sperrzeiten["zug"].astype(int)
+    sperrzeiten["element"] = sperrzeiten["element"].astype(int)
+    sperrzeiten.update({"zuege": [zug["train_id"] for zug in timetable], "elemente": elemente, "ankuenfte": ankuenfte})
+    return sperrzeiten
+
+def finde_konflikte(sperrzeiten, infra_data, eps=1e-6):
+    """Zeitpunkte, an denen ein Element mehr Züge hält als seine Kapazität.
+
+    Freigabe und Reservierung zur selben Zeit sind kein Konflikt. Rückgabe: Liste von
+    {"element", "kapazitaet", "zeit", "bis", "zuege"}, nach Zeit sortiert; "bis" ist das
+    Ende der Überbelegung.
+    """
+    infra_yaml = infra_data["infrastructure"]
+    kapazitaet = np.array([infra_yaml[name].get("normal_capacity", 1) for name in sperrzeiten["elemente"]])
+    element, zug = sperrzeiten["element"], sperrzeiten["zug"]
+    beginn, ende = sperrzeiten["beginn"], sperrzeiten["ende"]
+    echt = ende - beginn > eps  # Belegungen ohne Dauer halten niemanden auf
+    element, zug, beginn, ende = element[echt], zug[echt], beginn[echt], ende[echt]
+
+    # Sweep je Element: +1 bei Beginn, -1 bei Ende, Enden vor Beginnen zur selben Zeit
+    zeiten = np.concatenate([beginn, ende - eps])
+    delta = np.concatenate([np.ones(len(beginn), dtype=int), -np.ones(len(ende), dtype=int)])
+    welches = np.concatenate([element, element])
+    ordnung = np.lexsort((delta, zeiten, welches))
+    belegung = np.cumsum(delta[ordnung])  # jede Gruppe ist in sich ausgeglichen
+    ueber = np.flatnonzero((belegung > kapazitaet[welches[ordnung]]) & (delta[ordnung] == 1))
+
+    konflikte = []
+    for k in ueber:
+        e, t = welches[ordnung[k]], zeiten[ordnung[k]]
+        if konflikte and konflikte[-1]["_element"] == e and t < konflikte[-1]["bis"]:
+            continue  # gehört zur selben Überbelegung
+        aktiv = np.flatnonzero((element == e) & (beginn <= t) & (ende - eps > t))
+        bis = np.sort(ende[aktiv])[len(aktiv) - kapazitaet[e] - 1]  # ab dann reicht die Kapazität wieder
+        konflikte.append({
+            "_element": e,
+            "element": sperrzeiten["elemente"][e],
+            "kapazitaet": int(kapazitaet[e]),
+            "zeit": float(t),
+            "bis": float(bis),
+            "zuege": sorted(sperrzeiten["zuege"][z] for z in zug[aktiv])
+        })
+    for konflikt in konflikte:
+        del konflikt["_element"]
+    return sorted(konflikte, key=lambda k: (k["zeit"], k["element"]))
+
+def pruefe_fahrplan(infra_data, timetable, breaktimes, horizont=simulation.max_sim_time):
+    """Sperrzeiten und Konflikte eines Fahrplans; "konfliktfrei" heißt: die Simulation läuft ohne Warten"""
+    sperrzeiten = berechne_sperrzeiten(infra_data, timetable, breaktimes, horizont)
+    konflikte = finde_konflikte(sperrzeiten, infra_data)
+    return {"konfliktfrei": not konflikte, "konflikte": konflikte, "sperrzeiten": sperrzeiten}
+
+def sperrzeiten_aus_log(ereignisse, t_ende=None):
+    """Belegungen aus einem Ereignisprotokoll der Simulation: [(zug, element, beginn, ende)];
+    bei t_ende offene Belegungen enden dort, ohne t_ende fehlen sie"""
+    offen, belegungen = {}, []
+    for ereignis in ereignisse:
+        zug, t = ereignis["zug"], ereignis["t"]
+        if "reserved" in ereignis or ereignis.get("ende"):
+            neu = set() if ereignis.get("ende") else set(ereignis["reserved"])
+            alt = offen.setdefault(zug, {})
+            for element in list(alt):
+                if element not in neu:
+                    belegungen.append((zug, element, alt.pop(element), t))
+            for element in neu:
+                alt.setdefault(element, t)
+    if t_ende is not None:
+        belegungen += [(zug, element, b, t_ende) for zug, alt in offen.items() for element, b in alt.items()]
+    return belegungen
+
+if __name__ == "__main__":
+    import time
+    from simulationslog import ListenSenke
+
+    infra_data, timetable, breaktimes = simulation.lade_eingaben()
+    start = time.perf_counter()
+    ergebnis = pruefe_fahrplan(infra_data, timetable, breaktimes)
+    dauer = time.perf_counter() - start
+    sperrzeiten = ergebnis["sperrzeiten"]
+    print(f"⏱️  {len(timetable)} Züge, {len(sperrzeiten['beginn'])} Belegungen in {dauer * 1000:.2f} ms")
+
+    if ergebnis["konfliktfrei"]:
+        # Gegenprobe mit SimPy: ohne Konflikte müssen die Belegungen übereinstimmen
+        senke = ListenSenke()
+        simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, simulation.max_sim_time, [senke])
+        analytisch = sorted((sperrzeiten["zuege"][z], sperrzeiten["elemente"][e], b, en)
+                            for z, e, b, en in zip(sperrzeiten["zug"], sperrzeiten["element"],
+                                                   sperrzeiten["beginn"], sperrzeiten["ende"]) if en > b)
+        simuliert = sorted(b for b in sperrzeiten_aus_log(senke.ereignisse, simulation.max_sim_time) if b[3] > b[2])
+        abweichung = max((abs(a[2] - s[2]) + abs(a[3] - s[3]) for a, s in zip(analytisch, simuliert)), default=0.0)
+        print(f"✅ Konfliktfrei; Abweichung zu SimPy {abweichung:.2e}s")
+    else:
+        print(f"⚠️ {len(ergebnis['konflikte'])} Konflikte, die Simulation entscheidet über Wartezeiten:")
+        for k in ergebnis["konflikte"][:20]:
+            print(f"  {k['zeit']:8.1f}–{k['bis']:8.1f}s {k['element']:<6} (Kapazität {k['kapazitaet']}): {', '.join(k['zuege'])}")
+
+    with open("json/konflikte.json", "w") as f:
+        json.dump(ergebnis["konflikte"], f, indent=2, ensure_ascii=False)
+    print("✅ JSON erstellt: json/konflikte.json")
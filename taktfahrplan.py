@@ -0,0 +1,117 @@
+"""Taktfahrplan: erzeugt aus einer kompakten Taktbeschreibung die Zugliste der Simulation.
+
+Eine Linie beschreibt einen Zuglauf, der im festen Abstand wiederholt wird:
+
+    - linie: RE                 # Präfix der train_id (RE_001, RE_002, ...)
+      von: SO                   # Abfahrtsstation
+      nach: BDF                 # Zielstation
+      takt: 1800                # Abstand der Abfahrten in s
+      beginn: 0                 # erste Abfahrt in s
+      ende: 86400               # keine Abfahrt ab diesem Zeitpunkt
+      halte: [SO, BIST, GLF]    # Stationen mit Halt (Standard: keine)
+      haltezeit: 60             # Haltezeit je Halt in s
+      haltezeiten: {SO: 120}    # abweichende Haltezeiten
+      occupied_before_start: 0  # wie in 3_Fahrplan.yaml
+      wende: return             # "return": eine Rückfahrt nach der Wendezeit, sonst "terminate"
+      wendezeit: 300            # Haltezeit am Ziel vor der Rückfahrt in s
+
+Das Ergebnis hat dasselbe Format wie "timetable" in 3_Fahrplan.yaml, nach Abfahrtszeit sortiert.
+"""
+import yaml
+
+WENDEN = ("terminate", "return")
+
+def pruefe_linie(linie, route=None):
+    """ValueError mit dem Namen der Linie, wenn Pflichtangaben fehlen oder ungültig sind;
+       mit route werden auch von/nach gegen die Stationen der Strecke geprüft"""
+    name = linie.get("linie")
+    if name is None:
+        raise ValueError(f"Taktlinie ohne 'linie': {linie}")
+    fehlt = [schluessel for schluessel in ("von", "nach", "takt") if schluessel not in linie]
+    if fehlt:
+        raise ValueError(f"Taktlinie {name}: {', '.join(fehlt)} fehlt")
+    takt = linie["takt"]
+    if not isinstance(takt, (int, float)) or isinstance(takt, bool) or not takt > 0:
+        raise ValueError(f"Taktlinie {name}: takt muss eine Zahl > 0 sein, ist {takt!r}")
+    if route is not None:
+        for schluessel in ("von", "nach"):
+            if linie[schluessel] not in route:
+                raise ValueError(f"Taktlinie {name}: {schluessel}={linie[schluessel]!r} liegt nicht auf der Strecke")
+    wende = linie.get("wende", "terminate")
+    if wende not in WENDEN:
+        raise ValueError(f"Taktlinie {name}: wende muss {' oder '.join(WENDEN)} sein, ist {wende!r}")
+
+def iter_zuege(linie, route=None):
+    """Züge einer Linie in Abfahrtsreihenfolge; die Linie wird vorher mit pruefe_linie() geprüft"""
+    pruefe_linie(linie, route)
+    halte = linie.get("halte", [])
+    haltezeiten = {station: linie.get("haltezeit", 0) for station in halte}
+    haltezeiten.update(linie.get("haltezeiten", {}))
+    wende = linie.get("wende", "terminate")
+    if wende == "return" and "wendezeit" in linie:
+        haltezeiten[linie["nach"]] = linie["wendezeit"]
+    stops = [{"station": station, "stop_time": zeit} for station, zeit in haltezeiten.items()]
+
+    nummer = 0
+    abfahrt = linie.get("beginn", 0)
+    while abfahrt < linie.get("ende", 86400):
+        nummer += 1
+        zug = {
+            "train_id": f"{linie['linie']}_{nummer:03d}",
+            "behaviour": wende,
+            "depart": {
+                "station": linie["von"],
+                "time": abfahrt,
+                "occupied_before_start": linie.get("occupied_before_start", 0)
+            },
+            "arrival": {"station": linie["nach"]},
+            "stops": [dict(stop) for stop in stops]
+        }
+        if wende == "return":
+            zug["rueckfahrten"] = 1  # zurück zur Abfahrtsstation, dann Ende statt endlos zu pendeln
+        yield zug
+        abfahrt = linie.get("beginn", 0) + nummer * linie["takt"]
+
+def erzeuge_taktfahrplan(linien, route=None):
+    """Zugliste aller Linien, nach Abfahrtszeit sortiert; train_ids müssen eindeutig sein.
+       Mit route (Liste der Elemente) müssen von/nach jeder Linie darauf liegen."""
+    timetable = sorted(
+        (zug for linie in linien for zug in iter_zuege(linie, route)),
+        key=lambda zug: zug["depart"]["time"]
+    )
+    ids = [zug["train_id"] for zug in timetable]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Linien erzeugen doppelte train_id, 'linie' muss eindeutig sein")
+    return timetable
+
+def lade_taktfahrplan(pfad, route=None):
+    """Liest die Linien unter "takt" aus einer YAML-Datei und erzeugt die Zugliste"""
+    with open(pfad, "r") as f:
+        return erzeuge_taktfahrplan(yaml.safe_load(f)["takt"], route)
+
+if __name__ == "__main__":
+    import importlib
+    import time
+    from simulationslog import ZaehlerSenke
+
+    simulation = importlib.import_module("7_simulation")
+
+    # Beispiel: Stundentakt in beide Richtungen über 24 Stunden, wie die Züge in 3_Fahrplan.yaml
+    halte = ["SO", "BIST", "GLF", "WR", "UT", "AEF", "KIAL", "BDFB", "BDF"]
+    linien = [
+        {"linie": "Z", "von": "SO", "nach": "BDF", "takt": 3600, "beginn": 0, "ende": 86400,
+         "halte": halte, "haltezeit": 60, "haltezeiten": {"SO": 120, "BDF": 120}, "wende": "terminate"},
+        {"linie": "G", "von": "BDF", "nach": "SO", "takt": 3600, "beginn": 1800, "ende": 86400,
+         "halte": halte, "haltezeit": 60, "haltezeiten": {"SO": 120, "BDF": 120}, "wende": "terminate"}
+    ]
+    horizont = 86400 + 3 * 3600
+
+    infra_data, _, breaktimes = simulation.lade_eingaben()
+    timetable = erzeuge_taktfahrplan(linien, infra_data["route"])
+    senke = ZaehlerSenke()
+    start = time.perf_counter()
+    simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, horizont, [senke])
+    zusammenfassung = senke.zusammenfassung()
+    print(f"🚆 {len(timetable)} Züge erzeugt, {zusammenfassung['beendet']} angekommen, "
+          f"{zusammenfassung['ereignisse']} Ereignisse in {time.perf_counter() - start:.2f}s "
+          f"(Horizont {horizont / 3600:.0f} h)")
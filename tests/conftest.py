@@ -0,0 +1,19 @@
+import importlib
+import os
+import sys
+import pytest
+
+# Die Skripte liegen flach im Wurzelverzeichnis und werden per importlib geladen
+WURZEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WURZEL)
+
+@pytest.fixture(scope="module")
+def eingaben():
+    """(infra_data, timetable, breaktimes) wie im Skript, relativ zum Wurzelverzeichnis geladen"""
+    simulation = importlib.import_module("7_simulation")
+    alt = os.getcwd()
+    os.chdir(WURZEL)
+    try:
+        return simulation.lade_eingaben(breaktimes_aus_pipeline=True)
+    finally:
+        os.chdir(alt)
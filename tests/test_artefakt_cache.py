@@ -0,0 +1,18 @@
+import os
+import numpy as np
+from artefakt_cache import ArtefaktCache
+
+def ordnergroesse(ordner):
+    return sum(os.path.getsize(os.path.join(ordner, name)) for name in os.listdir(ordner))
+
+def test_mitgezaehlte_groesse_und_verdraengung(tmp_path):
+    cache = ArtefaktCache(str(tmp_path), max_bytes=200_000)
+    for i in range(100):
+        cache.lege_ab(cache.schluessel(i), np.zeros(1000))
+    assert cache.groesse == ordnergroesse(tmp_path) <= 200_000
+    assert cache.hole(cache.schluessel(99)) is not None  # neueste Einträge bleiben
+    assert cache.hole(cache.schluessel(0)) is None
+
+    cache.lege_ab(cache.schluessel(99), np.zeros(10))  # Überschreiben zählt nur die Differenz
+    assert cache.groesse == ordnergroesse(tmp_path)
+    assert ArtefaktCache(str(tmp_path), max_bytes=200_000).groesse == cache.groesse
@@ -0,0 +1,67 @@
+import importlib
+import numpy as np
+import pytest
+
+fahrprofile = importlib.import_module("5_Fahrprofile")
+
+def strecke(*abschnitte):
+    return [{"length": laenge, "v_ziel": v_ziel} for laenge, v_ziel in abschnitte]
+
+def test_batch_ueberschreitung_ohne_sprung():
+    # Start über dem Limit, die Bremsung erreicht es im ersten Abschnitt nicht
+    abschnitte = strecke((974.56, 40), (1059.76, 100))
+    ergebnis = fahrprofile.simuliere_batch([{"streckenabschnitte": abschnitte, "startgeschwindigkeit": 35.72,
+                                             "bremsung_am_ende": False, "beschleunigen": 0.875, "bremsen": 0.503}])
+    T = fahrprofile.berechne_fahrprofil(abschnitte, 35.72, False, 0.875, 0.503)[-1]["t"]
+    assert ergebnis["T"][0] == pytest.approx(T, rel=1e-7)
+    assert ergebnis["T"][0] == pytest.approx(77.30, abs=0.01)
+
+def test_batch_wie_einzelprofil():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        profile = []
+        for _ in range(rng.integers(1, 6)):
+            abschnitte = strecke(*[(float(rng.uniform(50, 2000)), float(rng.choice([40, 60, 80, 100, 120, 160])))
+                                   for _ in range(rng.integers(1, 5))])
+            profile.append({
+                "streckenabschnitte": abschnitte,
+                # auch Starts über dem Limit des ersten Abschnitts
+                "startgeschwindigkeit": float(rng.choice([0.0, rng.uniform(0, 45)])),
+                "bremsung_am_ende": bool(rng.integers(2)),
+                "beschleunigen": float(rng.uniform(0.3, 1.2)),
+                "bremsen": float(rng.uniform(0.3, 1.2))
+            })
+        ergebnis = fahrprofile.simuliere_batch(profile)
+        for i, p in enumerate(profile):
+            stuetzpunkte = fahrprofile.berechne_fahrprofil(p["streckenabschnitte"], p["startgeschwindigkeit"],
+                                                           p["bremsung_am_ende"], p["beschleunigen"], p["bremsen"])
+            assert ergebnis["T"][i] == pytest.approx(stuetzpunkte[-1]["t"], rel=1e-7)
+            assert ergebnis["v_ende"][i] == pytest.approx(stuetzpunkte[-1]["v"], rel=1e-6, abs=1e-6)
+
+@pytest.mark.parametrize("abschnitte, v0, halt", [
+    (strecke((1500, 100), (800, 40), (1200, 80)), 0.0, True),   # Bremsphase vor dem 40er-Abschnitt, Halt am Ende
+    (strecke((974.56, 40), (1059.76, 100)), 35.72, False),      # Start über dem Limit
+    (strecke((974.56, 40), (1059.76, 100)), 35.72, True),       # Start über dem Limit mit Halt
+    (strecke((2000, 120)), 0.0, True),
+    (strecke((500, 60), (3000, 160), (700, 60)), 60 / 3.6, False),
+])
+def test_analytisch_wie_numerisch(abschnitte, v0, halt):
+    # Die Zeitschritt-Integration nähert sich beim Halt am Ende nur langsam an, daher 1 %
+    T = fahrprofile.berechne_fahrprofil(abschnitte, v0, halt, 0.875, 0.503)[-1]["t"]
+    numerisch = fahrprofile.integriere_numerisch(abschnitte, v0, halt, 0.875, 0.503, dt=0.01)
+    assert numerisch["Zeit [s]"][-1] == pytest.approx(T, rel=0.01)
+
+def test_bremsphase_dauer_v_durch_b():
+    # Einzige Bremsphase von 100 auf 40 km/h dauert (v1 - v0) / b
+    stuetzpunkte = fahrprofile.berechne_fahrprofil(strecke((3000, 100), (1000, 40)), 100 / 3.6, False, 0.875, 0.503)
+    bremsung = [(p, q) for p, q in zip(stuetzpunkte, stuetzpunkte[1:]) if p["a"] < 0]
+    assert len(bremsung) == 1
+    p, q = bremsung[0]
+    assert q["t"] - p["t"] == pytest.approx((100 - 40) / 3.6 / 0.503)
+    assert q["v"] == pytest.approx(40 / 3.6)
+    assert q["x"] == pytest.approx(3000)
+
+def test_halt_am_ende():
+    stuetzpunkte = fahrprofile.berechne_fahrprofil(strecke((2000, 120)), 0.0, True, 0.875, 0.503)
+    assert stuetzpunkte[-1]["v"] == pytest.approx(0.0, abs=1e-6)
+    assert stuetzpunkte[-1]["x"] == pytest.approx(2000)
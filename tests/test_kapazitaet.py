@@ -0,0 +1,39 @@
+import importlib
+import pytest
+import kapazitaet
+from simulationslog import ListenSenke
+
+simulation = importlib.import_module("7_simulation")
+
+def abfahrten(ereignisse):
+    """Erste Einfahrt jedes Zuges in ein Element hinter seiner Abfahrtsstation: {zug: t}"""
+    start, abfahrt = {}, {}
+    for e in ereignisse:
+        if "element" not in e:
+            continue
+        start.setdefault(e["zug"], e["element"])
+        if e["element"] != start[e["zug"]]:
+            abfahrt.setdefault(e["zug"], e["t"])
+    return abfahrt
+
+@pytest.mark.parametrize("richtung", ["forward", "backward"])
+def test_musterzuege_fahren_zur_abfahrtszeit(eingaben, richtung):
+    infra_data, timetable, breaktimes = eingaben
+    muster = kapazitaet.muster_zuege(timetable, infra_data["route"])[richtung]
+    zuege = kapazitaet.erzeuge_fahrplan([muster], 1084.6, 3 * 1084.6)
+    senke = ListenSenke()
+    simulation.fuehre_simulation_aus(infra_data, zuege, breaktimes, 6 * 3600, [senke])
+    abfahrt = abfahrten(senke.ereignisse)
+    for zug in zuege:
+        # Ohne andere Züge keine Wartezeit: Abfahrt genau zur Fahrplanzeit
+        assert abfahrt[zug["train_id"]] == pytest.approx(zug["depart"]["time"])
+
+def test_kein_zug_vor_seiner_abfahrtszeit(eingaben):
+    infra_data, timetable, breaktimes = eingaben
+    muster = list(kapazitaet.muster_zuege(timetable, infra_data["route"]).values())
+    zuege = kapazitaet.erzeuge_fahrplan(muster, 300, 1800)
+    senke = ListenSenke()
+    simulation.fuehre_simulation_aus(infra_data, zuege, breaktimes, 6 * 3600, [senke], deadlock_erkennung=True)
+    for zug_id, t in abfahrten(senke.ereignisse).items():
+        geplant = next(z["depart"]["time"] for z in zuege if z["train_id"] == zug_id)
+        assert t >= geplant - 1e-9
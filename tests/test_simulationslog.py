@@ -0,0 +1,24 @@
+import copy
+import importlib
+import pytest
+import simulationslog
+
+simulation = importlib.import_module("7_simulation")
+
+def test_log_wird_bei_ausnahme_geschlossen(eingaben, tmp_path):
+    infra_data, timetable, breaktimes = eingaben
+    zug = copy.deepcopy(timetable[0])
+    zug["fahrzeitfaktor"] = "kaputt"  # TypeError im Zugprozess bei der ersten Fahrzeit
+    pfad = str(tmp_path / "log.jsonl.gz")
+    with pytest.raises(TypeError):
+        simulation.fuehre_simulation_aus(infra_data, [zug], breaktimes, 3600, [simulationslog.DateiSenke(pfad)])
+    ereignisse = simulationslog.lade(pfad)  # vollständiger gzip-Strom, gepufferte Ereignisse sind da
+    assert ereignisse and ereignisse[0]["zug"] == zug["train_id"]
+
+def test_dateisenke_leert_nach_zeit(tmp_path):
+    pfad = str(tmp_path / "log.jsonl")
+    senke = simulationslog.DateiSenke(pfad, puffer_ereignisse=1000, puffer_sekunden=0.0)
+    senke.schreibe({"t": 0, "zug": "Z1", "element": "SO"})
+    with open(pfad) as f:  # ohne schliesse() bereits auf der Platte
+        assert f.read().count("\n") == 1
+    senke.schliesse()
@@ -0,0 +1,39 @@
+import importlib
+import pytest
+import taktfahrplan
+from simulationslog import KennzahlenSenke
+
+simulation = importlib.import_module("7_simulation")
+
+def test_wende_return_faehrt_einmal_zurueck(eingaben):
+    infra_data, _, breaktimes = eingaben
+    halte = ["SO", "BIST", "GLF", "WR", "UT", "AEF", "KIAL", "BDFB", "BDF"]
+    timetable = taktfahrplan.erzeuge_taktfahrplan([
+        {"linie": "R", "von": "SO", "nach": "BDF", "takt": 3600, "beginn": 0, "ende": 6 * 3600,
+         "halte": halte, "haltezeit": 60, "wende": "return", "wendezeit": 300}
+    ])
+    senke = KennzahlenSenke()
+    ergebnis = simulation.fuehre_simulation_aus(infra_data, timetable, breaktimes, 48 * 3600, [senke],
+                                                deadlock_erkennung=True, bis_alle_fertig=True)
+    assert ergebnis.deadlock is None
+    assert ergebnis.alle_fertig and ergebnis.zeit < 48 * 3600
+    ankuenfte = senke.kennzahlen(ergebnis.zeit)["ankuenfte"]
+    assert all(len(ankuenfte[zug["train_id"]]) == 2 for zug in timetable)  # Hin- und Rückfahrt
+
+@pytest.mark.parametrize("aenderung, meldung", [
+    ({"takt": 0}, "takt"),
+    ({"takt": -600}, "takt"),
+    ({"takt": None}, "takt"),
+    ({"von": "XX"}, "von"),
+    ({"nach": "XX"}, "nach"),
+    ({"wende": "pendeln"}, "wende"),
+])
+def test_ungueltige_linie(eingaben, aenderung, meldung):
+    infra_data, _, _ = eingaben
+    linie = {"linie": "F", "von": "SO", "nach": "BDF", "takt": 3600, **aenderung}
+    with pytest.raises(ValueError, match=f"Taktlinie F: .*{meldung}"):
+        taktfahrplan.erzeuge_taktfahrplan([linie], infra_data["route"])
+
+def test_linie_ohne_takt():
+    with pytest.raises(ValueError, match="Taktlinie F: takt fehlt"):
+        taktfahrplan.erzeuge_taktfahrplan([{"linie": "F", "von": "SO", "nach": "BDF"}])
@@ -0,0 +1,133 @@
+"""Kapazitätsverbrauch nach UIC 406: Fahrplan auf minimale Zugfolge verdichten.
+
+Die Sperrzeitentreppen der Züge (aus sperrzeiten.py, also aus den Breaktimes) werden in
+der Reihenfolge der Abfahrtszeiten so dicht wie möglich aneinandergeschoben, ohne dass
+ein Element mehr Züge hält als seine Kapazität und ohne dass ein Zug vor seinen Vorgänger
+rückt. Danach folgt noch einmal der erste Zug (zyklische Verdichtung); die Zeit bis zu
+seinem Beginn ist die Belegungszeit. Kapazitätsverbrauch = Belegungszeit · (1 + zuschlag)
+/ referenzzeit, für die ganze Strecke und für jedes Element einzeln verdichtet.
+
+Jeder Zug zählt mit seiner ersten Fahrt; Rückfahrten bei behaviour "return" gehen nicht ein.
+"""
+import copy
+import importlib
+import json
+import numpy as np
+import sperrzeiten
+from kapazitaet import erzeuge_fahrplan, muster_zuege
+
+simulation = importlib.import_module("7_simulation")
+
+# Einstellungen
+referenzzeit = 3600   # Bezugszeitraum in s
+zuschlag = 0.0        # Zuschlag auf die Belegungszeit (z. B. 0.25 für Pufferzeiten nach UIC 406)
+grenzwert = 0.75      # Empfohlener höchster Kapazitätsverbrauch (Hauptverkehrszeit, Mischverkehr)
+muster_takt = None    # z. B. 600: statt 3_Fahrplan.yaml je Richtung den ersten Zug im Takt über referenzzeit
+
+def treppen(infra_data, timetable, breaktimes):
+    """Relative Sperrzeiten je Zug: Arrays beginn/ende der Form (Züge, Elemente), NaN wo ungenutzt"""
+    route, infra_yaml = infra_data["route"], infra_data["infrastructure"]
+    routen_index, routentabellen = simulation.kompiliere_routentabellen(route, infra_yaml)
+    elemente = list(infra_yaml)
+    element_index = {name: i for i, name in enumerate(elemente)}
+
+    beginn = np.full((len(timetable), len(elemente)), np.nan)
+    ende = np.full((len(timetable), len(elemente)), np.nan)
+    for j, zug in enumerate(timetable):
+        einzelfahrt = dict(copy.deepcopy(zug), behaviour="terminate")
+        namen, b, e, _, vorab = sperrzeiten.sperrzeitentreppe(
+            einzelfahrt, route, infra_yaml, breaktimes, routen_index, routentabellen, 0.0)
+        b[0] -= vorab
+        for name, b_k, e_k in zip(namen, b, e):
+            k = element_index[name]
+            if e_k > b_k:
+                beginn[j, k] = np.fmin(beginn[j, k], b_k)
+                ende[j, k] = np.fmax(ende[j, k], e_k)
+    return elemente, beginn, ende
+
+def verdichte(beginn, ende, kapazitaet):
+    """Zyklische Verdichtung der Sperrzeitentreppen in Zeilenreihenfolge.
+
+    Rückgabe (versatz, belegung, belegung_je_element): Versatz je Zug und Belegungszeit
+    bei gemeinsamer Verdichtung aller Elemente, dazu die Belegungszeit jedes Elements für
+    sich allein verdichtet (NaN für ungenutzte Elemente).
+    """
+    zuege, anzahl_elemente = beginn.shape
+    cmax = int(kapazitaet.max())
+    gleise = np.arange(cmax)[None, :] < kapazitaet[:, None]  # belegbare Plätze je Element
+
+    def frei_ab(enden):
+        """Je Element das Ende, nach dem wieder ein Platz frei ist (-inf, solange einer frei ist)"""
+        return np.where(gleise, enden, np.inf).min(axis=1)
+
+    def belege(enden, neue_enden):
+        """Je genutztem Element ersetzt das neue Ende das früheste der belegten Plätze"""
+        zeilen = np.flatnonzero(~np.isnan(neue_enden))
+        platz = np.argmin(np.where(gleise, enden, np.inf), axis=1)
+        enden[zeilen, platz[zeilen]] = neue_enden[zeilen]
+
+    # Gemeinsam: ein Versatz je Zug, der auf allen genutzten Elementen passt
+    enden = np.full((anzahl_elemente, cmax), -np.inf)
+    versatz = np.zeros(zuege + 1)
+    o = 0.0
+    for zeile, j in enumerate(list(range(zuege)) + [0]):  # am Ende der erste Zug des nächsten Zeitraums
+        genutzt = ~np.isnan(beginn[j])
+        o = max(o, np.max((frei_ab(enden) - beginn[j])[genutzt], initial=-np.inf))
+        belege(enden, o + ende[j])
+        versatz[zeile] = o
+
+    # Je Element für sich: eigener Versatz je Element, wieder bis zum ersten Nutzer des nächsten Zeitraums
+    enden = np.full((anzahl_elemente, cmax), -np.inf)
+    o_e = np.zeros(anzahl_elemente)
+    erster = np.full(anzahl_elemente, np.nan)  # Versatz des ersten Nutzers
+    for j in range(zuege):
+        genutzt = ~np.isnan(beginn[j])
+        o_e = np.where(genutzt, np.fmax(o_e, frei_ab(enden) - np.nan_to_num(beginn[j])), o_e)
+        erster = np.where(genutzt & np.isnan(erster), o_e, erster)
+        belege(enden, o_e + ende[j])
+    genutzt = ~np.all(np.isnan(beginn), axis=0)
+    erster_nutzer = np.argmax(~np.isnan(beginn), axis=0)
+    b_erster = beginn[erster_nutzer, np.arange(anzahl_elemente)]
+    wieder = np.fmax(o_e, frei_ab(enden) - np.nan_to_num(b_erster))
+    belegung_je_element = np.where(genutzt, wieder - erster, np.nan)
+    return versatz, versatz[-1] - versatz[0], belegung_je_element
+
+def kapazitaetsverbrauch(infra_data, timetable, breaktimes, referenzzeit=referenzzeit, zuschlag=zuschlag):
+    """UIC-406-Kennzahlen der Züge in timetable (nach Abfahrtszeit geordnet)"""
+    timetable = sorted(timetable, key=lambda zug: zug["depart"]["time"])
+    elemente, beginn, ende = treppen(infra_data, timetable, breaktimes)
+    infra_yaml = infra_data["infrastructure"]
+    kapazitaet = np.array([infra_yaml[name].get("normal_capacity", 1) for name in elemente])
+    versatz, belegung, belegung_je_element = verdichte(beginn, ende, kapazitaet)
+
+    def verbrauch(t):
+        return t * (1 + zuschlag) / referenzzeit
+
+    return {
+        "referenzzeit": referenzzeit,
+        "zuschlag": zuschlag,
+        "zuege": len(timetable),
+        "belegung_s": float(belegung),
+        "kapazitaetsverbrauch": verbrauch(float(belegung)),
+        "versatz": {zug["train_id"]: float(o) for zug, o in zip(timetable, versatz)},
+        "elemente": {
+            name: {"kapazitaet": int(c), "belegung_s": float(t), "kapazitaetsverbrauch": verbrauch(float(t))}
+            for name, c, t in zip(elemente, kapazitaet, belegung_je_element) if not np.isnan(t)
+        }
+    }
+
+if __name__ == "__main__":
+    infra_data, timetable, breaktimes = simulation.lade_eingaben()
+    if muster_takt:
+        timetable = erzeuge_fahrplan(muster_zuege(timetable, infra_data["route"]).values(), muster_takt, referenzzeit)
+    ergebnis = kapazitaetsverbrauch(infra_data, timetable, breaktimes)
+
+    with open("json/uic406.json", "w") as f:
+        json.dump(ergebnis, f, indent=2, ensure_ascii=False)
+
+    for name, e in sorted(ergebnis["elemente"].items(), key=lambda x: -x[1]["kapazitaetsverbrauch"]):
+        print(f"  {name:<6} (Kapazität {e['kapazitaet']}) {e['belegung_s']:8.1f}s  {e['kapazitaetsverbrauch']:6.1%}")
+    zeichen = "⚠️" if ergebnis["kapazitaetsverbrauch"] > grenzwert else "🚆"
+    print(f"{zeichen} Strecke: {ergebnis['zuege']} Züge verdichtet auf {ergebnis['belegung_s']:.0f}s → "
+          f"Kapazitätsverbrauch {ergebnis['kapazitaetsverbrauch']:.1%} von {referenzzeit}s (Grenzwert {grenzwert:.0%})")
+    print("✅ JSON erstellt: json/uic406.json")